@@ -0,0 +1,346 @@
+"""
+Script for benchmarking every stage of the project on synthetic data
+
+Generates realistic price sheets of increasing size, times and memory-profiles adjusting, de-duplicating and acquiring
+the data, simplifying origins and processes, vectorizing profiles, and fitting and predicting with each model (and with
+the decision tree exported using 'tree_export.py'), then writes the results to a json file
+
+Requires installation of 'numpy', 'pandas', 'scikit-learn', 'nltk', 'scipy'
+
+Functions
+---------
+generate_data
+    Generates a synthetic price sheet in the format of 'data.csv'
+format_decimal
+    Formats numbers with two decimal places and a decimal comma
+measure
+    Measures the wall time and the peak memory allocated by a function call
+record
+    Measures a stage using measure, then prints and records the measurements
+run_benchmarks
+    Benchmarks every stage of the project on synthetic data of the given sizes
+
+Notes
+-----
+Usage: python benchmark.py [max_exponent] (sizes from 10 ** 3 up to 10 ** max_exponent rows, 10 ** 5 by default)
+"""
+
+import datetime
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy
+import pandas
+import data
+import origins
+import process_profile
+import processes
+import profiles
+import tree_export
+from sklearn.linear_model import LinearRegression
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.neighbors import KNeighborsClassifier, RadiusNeighborsClassifier
+from sklearn.naive_bayes import MultinomialNB, ComplementNB
+from sklearn.svm import SVC
+
+# possible sensory notes (before stemming, see profiles.vectorize)
+notes = ['almond', 'apple', 'apricot', 'bergamot', 'berries', 'biscuit', 'black tea', 'blackberry', 'blossom',
+         'blueberry', 'brown sugar', 'butter', 'camomile', 'caramel', 'cardamom', 'cedar', 'cherry', 'chocolate',
+         'cinnamon', 'citric acidity', 'clove', 'cocoa', 'cranberry', 'creamy body', 'dark chocolate', 'dates',
+         'dried fruits', 'earl grey', 'fig', 'floral', 'fudge', 'gooseberry', 'grape', 'grapefruit', 'guava',
+         'hazelnut', 'herbs', 'honey', 'jasmine', 'juicy', 'lemon', 'macadamia nuts', 'mandarin', 'mango',
+         'maple syrup', 'marzipan', 'melon', 'milk chocolate', 'nectarine', 'nutmeg', 'orange', 'papaya',
+         'passion fruit', 'pastry', 'peach', 'peanut butter', 'pear', 'pineapple', 'plum', 'pomelo', 'praline',
+         'raisins', 'raspberry', 'red apple', 'red currants', 'rhubarb', 'roasted hazelnut', 'rose', 'rum', 'smoky',
+         'spices', 'stone fruits', 'strawberry', 'sweet', 'tea', 'tropical fruits', 'vanilla', 'vibrant', 'violet',
+         'walnut', 'white grape', 'wild strawberry', 'yellow fruits']
+# other words of coffee names
+name_words = ['SHB', 'EP', 'Fazenda', 'Finca', 'Estate', 'Microlot', 'Washed', 'Natural', 'Gr. 2', 'Supremo',
+              'Excelso', 'AA', 'scr. 16 up', 'grainpro', 'Cooperative', 'Women Producers', 'Honey', 'Lot 7']
+# possible processing methods, with their frequencies
+process_names = ['washed', 'natural', 'pulped natural', 'anaerobic', 'wet hulled']
+process_frequencies = [0.6, 0.25, 0.08, 0.05, 0.02]
+# possible bag weights
+weights = [30, 35, 59, 60, 69, 70]
+
+
+def generate_data(n_rows: int, seed: int = 0) -> pandas.DataFrame:
+    """
+    Generates a synthetic price sheet in the format of 'data.csv'
+
+    Parameters
+    ----------
+    n_rows: int
+        Number of rows
+    seed: int, default 0
+        Seed of the random number generator
+
+    Returns
+    -------
+    pandas.DataFrame
+        Price sheet with the raw columns (units, decimal commas, dashes for missing scores and profiles, empty
+        missing names)
+    """
+
+    generator = numpy.random.default_rng(seed)
+
+    # coffee names: a country name or alias, then a few other words, some of them missing
+    countries = numpy.array(list(origins.origins_map) + list(origins.aliases))
+    coffees = pandas.Series(generator.choice(countries, n_rows))
+    for _ in range(3):
+        words = pandas.Series(generator.choice(name_words, n_rows))
+        coffees = coffees.where(generator.random(n_rows) < 0.3, coffees + ' ' + words)
+    coffees = coffees + ' ' + pandas.Series(generator.integers(1, 10 ** 6, n_rows)).astype(str)
+    coffees = coffees.mask(generator.random(n_rows) < 0.01)
+
+    # scores between 80 and 90 in steps of 0.25, some of them missing
+    scores = numpy.round(generator.uniform(80, 90, n_rows) * 4) / 4
+    score_strings = pandas.Series(scores).astype(str).str.replace('.', ',').str.removesuffix(',0')
+    score_strings = score_strings.mask(generator.random(n_rows) < 0.25, '-')
+
+    # prices growing with scores, like in the real data
+    prices = numpy.round(numpy.maximum(6 * scores - 459 + generator.normal(0, 8, n_rows), 15), 2)
+
+    # profiles of 2 to 5 notes, some of them missing
+    profile_notes = generator.choice(notes, (n_rows, 5))
+    n_notes = generator.integers(2, 6, n_rows)
+    profile_strings = pandas.Series(profile_notes[:, 0])
+    for column in range(1, 5):
+        profile_strings = profile_strings.where(n_notes <= column, profile_strings + ', ' + profile_notes[:, column])
+    profile_strings = profile_strings.mask(generator.random(n_rows) < 0.15, '-')
+
+    return pandas.DataFrame({'Weight': pandas.Series(generator.choice(weights, n_rows)).astype(str) + ' kg',
+                             'Coffee': coffees,
+                             'Process': generator.choice(process_names, n_rows, p=process_frequencies),
+                             'SCA score': score_strings,
+                             'Sensory profile': profile_strings,
+                             'Approx. no of bags SPOT': generator.integers(1, 700, n_rows),
+                             'Cena PLN/kg netto': format_decimal(prices),
+                             'Price USD/kg': format_decimal(prices / 4.27),
+                             'Price EUR/kg': format_decimal(prices / 4.69)})
+
+
+def format_decimal(values: numpy.ndarray) -> pandas.Series:
+    """
+    Formats numbers with two decimal places and a decimal comma
+
+    Parameters
+    ----------
+    values: numpy.ndarray
+        Numbers to format
+
+    Returns
+    -------
+    pandas.Series
+        Formatted numbers, e.g. '35,83'
+    """
+
+    return pandas.Series(values).map('{:.2f}'.format).str.replace('.', ',')
+
+
+def measure(function, *args, reset=None, **kwargs) -> tuple[object, dict[str, float]]:
+    """
+    Measures the wall time and the peak memory allocated by a function call
+
+    Parameters
+    ----------
+    function
+        Function to call
+    *args
+        Positional arguments of the function
+    reset: default None
+        Function called without arguments between the timed and the traced calls, undoing the side effects of the first
+        call (e.g. restoring an overwritten file, clearing a cache), nothing is undone if None
+    **kwargs
+        Keyword arguments of the function
+
+    Returns
+    -------
+    tuple[object, dict[str, float]]
+        Result of the timed call and a {'seconds': wall time, 'peak_memory_mb': peak allocated memory} dictionary
+
+    Notes
+    -----
+    The function is called twice, first timed without tracing, as tracemalloc slows down every allocation, then traced
+    for its peak memory
+    """
+
+    # time the call without tracing
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    seconds = time.perf_counter() - start
+
+    # trace the memory allocated by a separate call
+    if reset is not None:
+        reset()
+    tracemalloc.start()
+    try:
+        function(*args, **kwargs)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return result, {'seconds': seconds, 'peak_memory_mb': peak_memory / 2 ** 20}
+
+
+def record(results: list[dict], stage: str, rows: int, function, *args, reset=None, **kwargs):
+    """
+    Measures a stage using measure, then prints and records the measurements
+
+    Parameters
+    ----------
+    results: list[dict]
+        Measurements of the previous stages, extended in place
+    stage: str
+        Name of the stage
+    rows: int
+        Number of rows processed by the stage
+    function
+        Function to call
+    *args
+        Positional arguments of the function
+    reset: default None
+        Function undoing the side effects of a call, see measure
+    **kwargs
+        Keyword arguments of the function
+
+    Returns
+    -------
+    object
+        Result of the timed call
+    """
+
+    result, measurements = measure(function, *args, reset=reset, **kwargs)
+    results.append({'stage': stage, 'rows': rows, **measurements})
+    print(f'{stage:<40} {rows:>10} rows {measurements["seconds"]:>10.3f} s {measurements["peak_memory_mb"]:>10.1f} MB')
+
+    return result
+
+
+def run_benchmarks(sizes: list[int] | None = None,
+                   results_file_name: str | None = 'benchmark.json',
+                   max_svc_rows: int = 20000) -> list[dict]:
+    """
+    Benchmarks every stage of the project on synthetic data of the given sizes
+
+    Parameters
+    ----------
+    sizes: list[int] | None, default None
+        Numbers of rows of the training data (the testing data has a quarter as many), 10 ** 3 to 10 ** 5 if None
+    results_file_name: str | None, default 'benchmark.json'
+        Name of the json file for the results, not written if None
+    max_svc_rows: int, default 20000
+        Largest training data to fit the Support Vector Classifier on, as its fitting time grows quadratically or worse
+
+    Returns
+    -------
+    list[dict]
+        {'stage': stage name, 'rows': number of rows, 'seconds': wall time, 'peak_memory_mb': peak allocated memory}
+        dictionaries
+    """
+
+    if sizes is None:
+        sizes = [10 ** 3, 10 ** 4, 10 ** 5]
+    results_file_name = results_file_name and os.path.abspath(results_file_name)
+
+    results = []
+
+    print('\nBenchmarking the project on synthetic data...\n')
+
+    # work in a temporary directory, as the data files have fixed names
+    working_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        os.chdir(temporary_dir)
+        try:
+            for size in sizes:
+
+                # generate the data (the testing data partially overlapping with the training data)
+                train_data = generate_data(size, seed=size)
+                test_data = pandas.concat([generate_data(size // 4 - size // 20, seed=size + 1),
+                                           train_data.sample(size // 20, random_state=size)])
+                train_data.to_csv('data.csv', index=False)
+                test_data.to_csv('test_data.csv', index=False)
+
+                # adjust and acquire the data using 'data.py'
+                record(results, 'data.adjust_data', size, data.adjust_data, 'data.csv')
+                data.adjust_data('test_data.csv')
+                # (restore the testing data overwritten by the timed call before the traced call)
+                shutil.copy('adjusted_test_data.csv', 'original_test_data.csv')
+                removed_data, _ = record(results, 'data.drop_duplicates', len(test_data), data.drop_duplicates,
+                                         'adjusted_data.csv', 'adjusted_test_data.csv',
+                                         reset=lambda: shutil.copy('original_test_data.csv', 'adjusted_test_data.csv'))
+                # check that the samples with missing names were kept, though the training data has some too
+                if removed_data['Coffee'].isna().any():
+                    raise RuntimeError('Samples with missing names were dropped as duplicates')
+                adjusted_data = pandas.read_csv('adjusted_data.csv')
+                record(results, 'data.drop_missing', size, data.drop_missing,
+                       adjusted_data[['Score', 'Profile']], adjusted_data['Price'])
+                record(results, 'data.get_data', size, data.get_data,
+                       ['Weight', 'Price', 'Score', 'Profile'], 'Coffee')
+
+                # simplify the origins and processes using 'origins.py' and 'processes.py'
+                train_features, train_origins, test_features, test_origins \
+                    = data.get_data(['Weight', 'Price', 'Score', 'Profile'], 'Coffee')
+                train_features, train_origins = record(results, 'origins.simplify_origins', size,
+                                                       origins.simplify_origins, train_features, train_origins)
+                test_features, test_origins = origins.simplify_origins(test_features, test_origins)
+                train_profiles, train_processes, test_profiles, test_processes = data.get_data('Profile', 'Process')
+                train_profiles, train_processes, test_profiles, test_processes \
+                    = record(results, 'processes.simplify_processes', size, processes.simplify_processes,
+                             train_profiles, train_processes, test_profiles, test_processes, print_map=False)
+
+                # vectorize the profiles using 'profiles.py'
+                profiles.stem.cache_clear()
+                train_vector, test_vector, _ = record(results, 'profiles.vectorize', size, profiles.vectorize,
+                                                      train_profiles, test_profiles, cache_dir=None,
+                                                      reset=profiles.stem.cache_clear)
+
+                # fit and predict with each model
+                train_numbers, test_numbers = train_features[['Weight', 'Price']], test_features[['Weight', 'Price']]
+                benchmarked_models = [
+                    ('LinearRegression', LinearRegression(), train_features[['Score']], train_features['Price'],
+                     test_features[['Score']]),
+                    ('DecisionTreeClassifier', DecisionTreeClassifier(), train_numbers, train_origins, test_numbers),
+                    ('KNeighborsClassifier', KNeighborsClassifier(), train_numbers, train_origins, test_numbers),
+                    ('RadiusNeighborsClassifier', RadiusNeighborsClassifier(radius=2, outlier_label='most_frequent'),
+                     train_numbers, train_origins, test_numbers),
+                    ('MultinomialNB', MultinomialNB(), train_vector, train_processes, test_vector),
+                    ('ComplementNB', ComplementNB(), train_vector, train_processes, test_vector),
+                    ('SVC', SVC(), train_vector, train_processes, test_vector),
+                    ('LinearSVC', process_profile.create_classifier('linear'), train_vector, train_processes,
+                     test_vector),
+                    ('SGDClassifier', process_profile.create_classifier('sgd'), train_vector, train_processes,
+                     test_vector)
+                ]
+                for name, model, train_x, train_y, test_x in benchmarked_models:
+                    if name == 'SVC' and size > max_svc_rows:
+                        continue
+                    record(results, f'{name}.fit', train_x.shape[0], model.fit, train_x, train_y)
+                    record(results, f'{name}.predict', test_x.shape[0], model.predict, test_x)
+                    # predict with the tree exported using 'tree_export.py' too
+                    if name == 'DecisionTreeClassifier':
+                        record(results, 'tree_export.predict', test_x.shape[0], tree_export.predict,
+                               tree_export.export_tree(model), test_x)
+
+        finally:
+            os.chdir(working_dir)
+
+    # write the results to a json file, along with the environment
+    if results_file_name is not None:
+        with open(results_file_name, 'w') as results_file:
+            json.dump({'created': datetime.datetime.now().isoformat(),
+                       'python': platform.python_version(),
+                       'pandas': pandas.__version__,
+                       'numpy': numpy.__version__,
+                       'results': results}, results_file, indent=4)
+
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmarks([10 ** exponent for exponent in range(3, int(sys.argv[1]) + 1)] if sys.argv[1:] else None)
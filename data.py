@@ -7,18 +7,70 @@ Functions
 ---------
 adjust_data
     Simplifies column labels, fixes data formatting and data types, then creates an adjusted csv file
+clean_data
+    Simplifies column labels, fixes data formatting and data types
+adjust_files
+    Adjusts many data files in parallel, then merges them into one adjusted csv file
+adjust_file
+    Adjusts a single data file of adjust_files, then pickles it
+hash_file
+    Computes a content hash of a file
 drop_duplicates
     Drops data present in the training set from the testing set, then overwrites the latter file
+normalize_keys
+    Collapses whitespace and lowers case in text columns of sample keys
+join_keys
+    Joins the columns of sample keys into texts
 drop_missing
     Removes rows with NaNs
+apply_schema
+    Converts the columns of adjusted data to their compact data types
+widen_floats
+    Converts the single-precision columns of adjusted data back to double precision
+write_adjusted
+    Writes adjusted data to a csv file and to its columnar cache
+write_cache
+    Writes adjusted data to the columnar cache of its csv file
+cache_is_current
+    Checks whether the columnar cache was written from the current version of its csv file
+read_adjusted
+    Reads chosen columns of adjusted data, preferably from the columnar cache
 get_data
     Gets relevant data from the adjusted data file(s)
+
+Notes
+-----
+Adjusted csv files are cached in Parquet files ('adjusted_data.csv' -> 'adjusted_data.parquet'), which requires
+installation of 'pyarrow', otherwise the csv files are read directly
+Adjusted data follows schema (repeated names as categories, small integers, single-precision floats), profiles can
+also be stored as 'pyarrow' strings, get_data gives back double-precision floats for fitting the models
+Files adjusted by adjust_files are cached in 'adjusted_cache' by default, along with a manifest of their content hashes
+Near-duplicate samples are found with MinHash and Locality-Sensitive Hashing, using 'minhash.py' (and 'numpy')
 """
 
+import concurrent.futures
+import glob
+import hashlib
+import json
+import os
 import pandas
-
-
-def adjust_data(file_name: str) -> None:
+import instrument
+import minhash
+
+# {column: data type} dictionary of adjusted data
+# (integers allow missing values, prices and scores need no more than single precision)
+schema = {
+    'Weight': 'Int16',
+    'Coffee': 'category',
+    'Process': 'category',
+    'Score': 'float32',
+    'Bags': 'Int32',
+    'Price': 'float32',
+    'Source': 'category'
+}
+
+
+def adjust_data(file_name: str, chunk_size: int | None = None) -> None:
     """
     Simplifies column labels, fixes data formatting and data types, then creates an adjusted csv file
 
@@ -28,6 +80,8 @@ def adjust_data(file_name: str) -> None:
     ----------
     file_name: str
         Name of the csv data file
+    chunk_size: int | None, default None
+        Number of rows to adjust at a time, the whole file at once if None
 
     Returns
     -------
@@ -35,11 +89,55 @@ def adjust_data(file_name: str) -> None:
 
     Notes
     -----
-    Creates a new file named 'adjusted_' + file_name
+    Creates a new file named 'adjusted_' + file_name, along with its columnar cache
+    In chunked mode, the adjusted file is written chunk by chunk, and its cache is built on the first read
     """
 
-    # read data from the provided file
-    data = pandas.read_csv(file_name)
+    adjusted_file_name = 'adjusted_' + file_name
+
+    if chunk_size is None:
+
+        # read data from the provided file
+        # adjust the data using clean_data
+        with instrument.stage('data.adjust_data') as record:
+            data = clean_data(pandas.read_csv(file_name, dtype=str))
+            record['rows'] = len(data)
+
+        # write the data to a new file and its cache using write_adjusted
+        write_adjusted(data, adjusted_file_name)
+
+    else:
+
+        # read, adjust and write the data chunk by chunk using clean_data
+        # (write the column labels with the first chunk, then append the next chunks)
+        with instrument.stage('data.adjust_data') as record, \
+                pandas.read_csv(file_name, dtype=str, chunksize=chunk_size) as chunks:
+            record['rows'] = 0
+            for chunk_number, chunk in enumerate(chunks):
+                clean_data(chunk).to_csv(adjusted_file_name, mode='a' if chunk_number else 'w',
+                                         header=not chunk_number, index=False)
+                record['rows'] += len(chunk)
+
+
+def clean_data(data: pandas.DataFrame) -> pandas.DataFrame:
+    """
+    Simplifies column labels, fixes data formatting and data types
+
+    Parameters
+    ----------
+    data: pandas.DataFrame
+        Raw data (or a chunk of it), read with all columns as strings
+
+    Returns
+    -------
+    pandas.DataFrame
+        Adjusted data
+
+    Notes
+    -----
+    Data types follow schema and do not depend on the values present, so that adjusted chunks match the data adjusted
+    at once
+    """
 
     # column labels
     # ['Weight', 'Coffee', 'Process', 'SCA score', 'Sensory profile', 'Approx. no of bags SPOT',
@@ -57,7 +155,7 @@ def adjust_data(file_name: str) -> None:
     # adjust the data
 
     # remove units from weights
-    # convert numeric strings to integers
+    # convert numeric strings to integers (allowing missing values)
     data['Weight'] = data['Weight'].str.removesuffix(' kg')
     data['Weight'] = pandas.to_numeric(data['Weight'])
     
@@ -71,7 +169,7 @@ def adjust_data(file_name: str) -> None:
     # replace dashes with NaNs in profiles
     data['Profile'] = data['Profile'].mask(data['Profile'] == '-')
     
-    # ensure that bags values are integers
+    # ensure that bags values are integers (allowing missing values)
     data['Bags'] = pandas.to_numeric(data['Bags'])
     
     # replace commas with periods in prices
@@ -79,11 +177,155 @@ def adjust_data(file_name: str) -> None:
     data['Price'] = data['Price'].str.replace(',', '.')
     data['Price'] = pandas.to_numeric(data['Price'])
 
-    # write the data to a new file
-    data.to_csv('adjusted_' + file_name, index=False)
+    # convert the columns to their compact data types using apply_schema
+    return apply_schema(data)
 
   
-def drop_duplicates(train_file_name: str, test_file_name: str) -> None:
+def adjust_files(sources: str | list[str], output_file_name: str = 'adjusted_data.csv',
+                 max_workers: int | None = None, cache_dir: str = 'adjusted_cache') -> dict[str, list[str]]:
+    """
+    Adjusts many data files in parallel, then merges them into one adjusted csv file
+
+    Adjusts data files prior to use
+
+    Parameters
+    ----------
+    sources: str | list[str]
+        Directory(ies) of csv data files, or glob pattern(s) of their names, e.g. 'sheets/2024-*.csv'
+    output_file_name: str, default 'adjusted_data.csv'
+        Name of the merged adjusted csv file
+    max_workers: int | None, default None
+        Number of worker processes, the number of processors if None
+    cache_dir: str, default 'adjusted_cache'
+        Directory for the adjusted files and the manifest of their content hashes
+
+    Returns
+    -------
+    dict[str, list[str]]
+        {'adjusted': names of the files adjusted, 'skipped': names of the files unchanged since the last run}
+        dictionary
+
+    Notes
+    -----
+    The merged data has an additional 'Source' column with the name (as found in sources) of the file of each row,
+    files are merged in alphabetical order
+    A file is hashed again only if its size or modification time has changed, it is adjusted again only if its content
+    hash has changed
+    """
+
+    if isinstance(sources, str):
+        sources = [sources]
+
+    # find the data files
+    file_names = []
+    for source in sources:
+        pattern = os.path.join(source, '*.csv') if os.path.isdir(source) else source
+        file_names.extend(sorted(glob.glob(pattern)))
+    file_names = list(dict.fromkeys(file_names))
+
+    # read the manifest of the previous run
+    # ({file name: {'hash': content hash, 'size': size, 'mtime': modification time}} dictionary)
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest_file_name = os.path.join(cache_dir, 'manifest.json')
+    manifest = {}
+    if os.path.exists(manifest_file_name):
+        with open(manifest_file_name) as manifest_file:
+            manifest = json.load(manifest_file)
+
+    # hash the new and modified files
+    for file_name in file_names:
+        file_stat = os.stat(file_name)
+        entry = manifest.get(file_name, {})
+        if entry.get('size') != file_stat.st_size or entry.get('mtime') != file_stat.st_mtime:
+            manifest[file_name] = {'hash': hash_file(file_name), 'size': file_stat.st_size,
+                                   'mtime': file_stat.st_mtime}
+
+    # adjust the files whose content has not been adjusted yet, in parallel using adjust_file
+    cache_file_names = {file_name: os.path.join(cache_dir, manifest[file_name]['hash'] + '.pkl')
+                        for file_name in file_names}
+    changed_file_names = [file_name for file_name in file_names if not os.path.exists(cache_file_names[file_name])]
+    with instrument.stage('data.adjust_files') as record:
+        if changed_file_names:
+            with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+                list(executor.map(adjust_file, changed_file_names,
+                                  [cache_file_names[file_name] for file_name in changed_file_names]))
+
+        # merge the adjusted files, with the name (and directory) of the file of each row
+        data = pandas.concat([pandas.read_pickle(cache_file_names[file_name]).assign(Source=file_name)
+                              for file_name in file_names], ignore_index=True)
+        # (categories of different files are merged by apply_schema)
+        data = apply_schema(data)
+        record['rows'] = len(data)
+
+    # write the merged data and its cache using write_adjusted
+    write_adjusted(data, output_file_name)
+
+    # save the manifest for the next run
+    with open(manifest_file_name, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=4)
+
+    return {'adjusted': changed_file_names,
+            'skipped': [file_name for file_name in file_names if file_name not in changed_file_names]}
+
+
+def adjust_file(file_name: str, cache_file_name: str) -> int:
+    """
+    Adjusts a single data file of adjust_files, then pickles it
+
+    Parameters
+    ----------
+    file_name: str
+        Name of the csv data file
+    cache_file_name: str
+        Name of the pickle file for the adjusted data
+
+    Returns
+    -------
+    int
+        Number of rows of the data file
+
+    Notes
+    -----
+    Runs in the worker processes of adjust_files, pickling keeps the data types of the adjusted data
+    """
+
+    # read data from the provided file
+    # adjust the data using clean_data
+    data = clean_data(pandas.read_csv(file_name, dtype=str))
+
+    # write a temporary file first, so that an interrupted run leaves no partial cache
+    data.to_pickle(cache_file_name + '.tmp', compression=None)
+    os.replace(cache_file_name + '.tmp', cache_file_name)
+
+    return len(data)
+
+
+def hash_file(file_name: str) -> str:
+    """
+    Computes a content hash of a file
+
+    Parameters
+    ----------
+    file_name: str
+        Name of the file
+
+    Returns
+    -------
+    str
+        Hexadecimal SHA-256 digest of the content of the file
+    """
+
+    file_hash = hashlib.sha256()
+    with open(file_name, 'rb') as hashed_file:
+        for block in iter(lambda: hashed_file.read(2 ** 20), b''):
+            file_hash.update(block)
+
+    return file_hash.hexdigest()
+
+
+def drop_duplicates(train_file_name: str, test_file_name: str,
+                    keys: str | list[str] = 'Coffee', normalize: bool = False, threshold: float | None = None,
+                    report_file_name: str | None = None) -> tuple[pandas.DataFrame, pandas.DataFrame]:
     """
     Drops data present in the training set from the testing set, then overwrites the latter file
 
@@ -96,29 +338,120 @@ def drop_duplicates(train_file_name: str, test_file_name: str) -> None:
         Name of the csv file with training data
     test_file_name: str
         Name of the csv file with testing data
+    keys: str | list[str], default 'Coffee'
+        Name(s) of column(s) identifying a sample, e.g. ['Coffee', 'Process', 'Weight'], samples with a missing key are
+        kept
+    normalize: bool, default False
+        Whether to collapse whitespace and ignore case in text keys before comparing them
+    threshold: float | None, default None
+        Lowest similarity of near-duplicate samples (Jaccard similarity of the shingles of their joined keys, e.g. of
+        ['Coffee', 'Profile'] to compare profiles too) found using 'minhash.py', only exact duplicates if None
+    report_file_name: str | None, default None
+        Name of the csv file for the report of the near-duplicate pairs, not written if None
 
     Returns
     -------
-    None
+    tuple[pandas.DataFrame, pandas.DataFrame]
+        Samples removed from the testing data, with their original row numbers as the index, and the near-duplicate
+        pairs ('Test row', 'Train row', 'Test key', 'Train key' and 'Similarity' columns, empty if threshold is None)
     """
 
+    if isinstance(keys, str):
+        keys = [keys]
+
     # read data from the provided files
-    train_data = pandas.read_csv(train_file_name)
-    test_data = pandas.read_csv(test_file_name)
+    # (with the data types of adjusted data, using apply_schema)
+    train_data = apply_schema(pandas.read_csv(train_file_name))
+    test_data = apply_schema(pandas.read_csv(test_file_name))
+
+    # build hashable sample keys for both sets
+    train_keys = train_data[keys]
+    test_keys = test_data[keys]
+    if normalize:
+        train_keys = normalize_keys(train_keys)
+        test_keys = normalize_keys(test_keys)
+
+    # find duplicated samples with a single hash-based lookup
+    # (samples with missing keys are never duplicates, as missing values are not equal to each other)
+    with instrument.stage('data.drop_duplicates', rows=len(test_data)):
+        duplicated = pandas.MultiIndex.from_frame(test_keys).isin(pandas.MultiIndex.from_frame(train_keys))
+        duplicated &= test_keys.notna().all(axis=1).to_numpy()
+
+    # find near-duplicate samples using 'minhash.py'
+    pairs = pandas.DataFrame(columns=['Test row', 'Train row', 'Test key', 'Train key', 'Similarity'])
+    if threshold is not None:
+        train_texts, test_texts = join_keys(train_keys), join_keys(test_keys)
+        with instrument.stage('data.drop_near_duplicates', rows=len(test_data)):
+            test_rows, train_rows, similarities = minhash.find_near_duplicates(test_texts, train_texts, threshold)
+        duplicated[test_rows] = True
+
+        # report the matched pairs
+        pairs = pandas.DataFrame({'Test row': test_rows, 'Train row': train_rows,
+                                  'Test key': [test_texts[row] for row in test_rows],
+                                  'Train key': [train_texts[row] for row in train_rows],
+                                  'Similarity': similarities})
+        if report_file_name is not None:
+            pairs.to_csv(report_file_name, index=False)
 
     # drop duplicated samples from the testing data
-    for index, sample in test_data['Coffee'].items():
-        if sample in train_data['Coffee'].values:
-            test_data = test_data.drop(index)
-    test_data = test_data.reset_index(drop=True)
+    removed_data = test_data[duplicated]
+    test_data = test_data[~duplicated].reset_index(drop=True)
+
+    # overwrite the testing data and its cache using write_adjusted
+    write_adjusted(test_data, test_file_name)
+
+    return removed_data, pairs
+
+
+def normalize_keys(keys: pandas.DataFrame) -> pandas.DataFrame:
+    """
+    Collapses whitespace and lowers case in text columns of sample keys
 
-    # overwrite the testing data
-    test_data.to_csv(test_file_name, index=False)
+    Parameters
+    ----------
+    keys: pandas.DataFrame
+        Columns identifying samples
+
+    Returns
+    -------
+    pandas.DataFrame
+        Input keys with normalized text columns
+    """
+
+    keys = keys.copy()
+    for column in keys.columns:
+        if not pandas.api.types.is_numeric_dtype(keys[column]):
+            keys[column] = keys[column].str.split().str.join(' ').str.lower()
+
+    return keys
+
+
+def join_keys(keys: pandas.DataFrame) -> list[str]:
+    """
+    Joins the columns of sample keys into texts
+
+    Parameters
+    ----------
+    keys: pandas.DataFrame
+        Columns identifying samples
+
+    Returns
+    -------
+    list[str]
+        Space-separated values of each sample, missing values are left out
+    """
+
+    texts = pandas.Series('', index=keys.index, dtype='string')
+    for column in keys.columns:
+        texts = texts + ' ' + keys[column].astype('string').fillna('')
+
+    return texts.str.strip().tolist()
 
 
 def drop_missing(data_to_check: pandas.Series | pandas.DataFrame,
-                 related_data: pandas.Series | pandas.DataFrame) \
-        -> tuple[pandas.Series | pandas.DataFrame, pandas.Series | pandas.DataFrame]:
+                 *related_data: pandas.Series | pandas.DataFrame,
+                 report: bool = False) \
+        -> tuple[pandas.Series | pandas.DataFrame, ...]:
     """
     Removes rows with NaNs
 
@@ -128,35 +461,230 @@ def drop_missing(data_to_check: pandas.Series | pandas.DataFrame,
     ----------
     data_to_check: pandas.Series | pandas.DataFrame
         Data with NaNs possibly present
-    related_data: pandas.Series | pandas.DataFrame
-        Data related to data_to_check
+    *related_data: pandas.Series | pandas.DataFrame
+        Data related to data_to_check (e.g. target, sample weights), aligned with it by index
+    report: bool, default False
+        Whether to also return the number of NaNs found in each column of data_to_check
 
     Returns
     -------
-    tuple[pandas.Series | pandas.DataFrame, pandas.Series | pandas.DataFrame]
-        Input data without NaN-including rows
+    tuple[pandas.Series | pandas.DataFrame, ...]
+        Input data without NaN-including rows, optionally followed by a {column: number of NaNs} dictionary
+
+    Notes
+    -----
+    A row is dropped if any column of data_to_check is NaN, so the numbers of NaNs per column may add up to more than
+    the number of dropped rows
     """
-    
-    # remove rows with NaNs from the data given
-    if isinstance(data_to_check, pandas.Series):
-        for index, missing in data_to_check.isna().items():
-            if missing:
-                data_to_check = data_to_check.drop(index)
-                related_data = related_data.drop(index)
-    elif isinstance(data_to_check, pandas.DataFrame):
-        for index, series in data_to_check.iterrows():
-            if series.hasnans:
-                data_to_check = data_to_check.drop(index)
-                related_data = related_data.drop(index)
-    
-    # reset indices
-    data_to_check = data_to_check.reset_index(drop=True)
-    related_data = related_data.reset_index(drop=True)
 
-    return data_to_check, related_data
+    with instrument.stage('data.drop_missing', rows=len(data_to_check)):
 
+        # find rows with NaNs in a single pass
+        missing = data_to_check.isna()
+        if isinstance(data_to_check, pandas.Series):
+            missing_counts = {data_to_check.name: int(missing.sum())}
+        else:
+            missing_counts = {column: int(count) for column, count in missing.sum().items()}
+            missing = missing.any(axis=1)
+        keep = ~missing
 
-def get_data(features_names: str | list[str], target_name: str, test: bool = True) \
+        # select the remaining rows of every object with one copy each
+        # reset indices
+        adjusted_data = []
+        for data_object in (data_to_check, *related_data):
+            data_object = data_object.loc[keep]
+            data_object.index = pandas.RangeIndex(len(data_object))
+            adjusted_data.append(data_object)
+
+    if report:
+        adjusted_data.append(missing_counts)
+
+    return tuple(adjusted_data)
+
+
+def apply_schema(data: pandas.DataFrame, arrow_strings: bool = False) -> pandas.DataFrame:
+    """
+    Converts the columns of adjusted data to their compact data types
+
+    Parameters
+    ----------
+    data: pandas.DataFrame
+        Adjusted data (or some of its columns)
+    arrow_strings: bool, default False
+        Whether to store profiles as 'pyarrow' strings
+
+    Returns
+    -------
+    pandas.DataFrame
+        Input data with the data types of schema
+
+    Notes
+    -----
+    Columns already of the right data type are not copied
+    """
+
+    dtypes = {column: dtype for column, dtype in schema.items() if column in data}
+    if arrow_strings and 'Profile' in data:
+        dtypes['Profile'] = 'string[pyarrow]'
+
+    return data.astype(dtypes)
+
+
+def widen_floats(data: pandas.DataFrame) -> pandas.DataFrame:
+    """
+    Converts the single-precision columns of adjusted data back to double precision
+
+    Parameters
+    ----------
+    data: pandas.DataFrame
+        Adjusted data (or some of its columns), with the data types of schema
+
+    Returns
+    -------
+    pandas.DataFrame
+        Input data with double-precision columns instead of single-precision ones
+
+    Notes
+    -----
+    The values are converted through their shortest decimal representation (e.g. 35.83 rather than 35.8300018), which
+    gives back the values of the adjusted csv files for numbers of up to 7 significant digits like scores and prices,
+    so that the models are fitted on the same values as without schema
+    """
+
+    columns = [column for column in data if data[column].dtype == 'float32']
+
+    return data.astype({column: str for column in columns}).astype({column: 'float64' for column in columns})
+
+
+def write_adjusted(data: pandas.DataFrame, file_name: str) -> None:
+    """
+    Writes adjusted data to a csv file and to its columnar cache
+
+    Parameters
+    ----------
+    data: pandas.DataFrame
+        Adjusted data
+    file_name: str
+        Name of the csv file
+
+    Returns
+    -------
+    None
+    """
+
+    data.to_csv(file_name, index=False)
+    try:
+        write_cache(data, file_name)
+    except ImportError:
+        # no Parquet engine available, read_adjusted will fall back to the csv file
+        pass
+
+
+def write_cache(data: pandas.DataFrame, file_name: str) -> None:
+    """
+    Writes adjusted data to the columnar cache of its csv file
+
+    Parameters
+    ----------
+    data: pandas.DataFrame
+        Adjusted data, as in the csv file
+    file_name: str
+        Name of the csv file, already written
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    The size and the modification time of the csv file are recorded in the metadata of the cache, like in the manifest
+    of adjust_files
+    """
+
+    import pyarrow
+    import pyarrow.parquet
+
+    # record the version of the csv file the cache is written from
+    file_stat = os.stat(file_name)
+    source = json.dumps({'size': file_stat.st_size, 'mtime': file_stat.st_mtime_ns})
+    table = pyarrow.Table.from_pandas(data, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'source': source.encode()})
+
+    pyarrow.parquet.write_table(table, file_name.removesuffix('.csv') + '.parquet')
+
+
+def cache_is_current(file_name: str) -> bool:
+    """
+    Checks whether the columnar cache was written from the current version of its csv file
+
+    Parameters
+    ----------
+    file_name: str
+        Name of the adjusted csv file
+
+    Returns
+    -------
+    bool
+        Whether the cache exists and the size and the modification time of the csv file are those recorded by
+        write_cache
+
+    Notes
+    -----
+    The modification times are compared for equality, so that a csv file replaced by a copy with an older
+    modification time (e.g. copied with cp -p or restored from an archive) is not served from a stale cache
+    """
+
+    import pyarrow.parquet
+
+    cache_name = file_name.removesuffix('.csv') + '.parquet'
+    if not os.path.exists(cache_name):
+        return False
+
+    # (caches written before the version was recorded have no source)
+    source = (pyarrow.parquet.read_schema(cache_name).metadata or {}).get(b'source')
+    file_stat = os.stat(file_name)
+
+    return source is not None and json.loads(source) == {'size': file_stat.st_size, 'mtime': file_stat.st_mtime_ns}
+
+
+def read_adjusted(file_name: str, columns: list[str] | None = None) -> pandas.DataFrame:
+    """
+    Reads chosen columns of adjusted data, preferably from the columnar cache
+
+    Parameters
+    ----------
+    file_name: str
+        Name of the adjusted csv file
+    columns: list[str] | None, default None
+        Names of the columns to read, all columns if None
+
+    Returns
+    -------
+    pandas.DataFrame
+        Chosen columns of the adjusted data
+
+    Notes
+    -----
+    The cache is rebuilt from the csv file if it is missing or was written from another version of the csv file, see
+    cache_is_current
+    """
+
+    with instrument.stage('data.read_adjusted') as record:
+        try:
+            # rebuild the cache if the csv file has been modified or replaced since
+            if not cache_is_current(file_name):
+                write_cache(apply_schema(pandas.read_csv(file_name)), file_name)
+            # read only the chosen columns
+            data = pandas.read_parquet(file_name.removesuffix('.csv') + '.parquet', columns=columns)
+        except ImportError:
+            # no Parquet engine available
+            data = pandas.read_csv(file_name, usecols=columns)
+        record['rows'] = len(data)
+
+    return data
+
+
+def get_data(features_names: str | list[str], target_name: str, test: bool = True, arrow_strings: bool = False) \
         -> tuple[pandas.Series | pandas.DataFrame, pandas.Series] \
         | tuple[pandas.Series | pandas.DataFrame, pandas.Series, pandas.Series | pandas.DataFrame, pandas.Series]:
     """
@@ -170,16 +698,24 @@ def get_data(features_names: str | list[str], target_name: str, test: bool = Tru
         Name of a column containing the target of interest
     test: bool, default True
         Whether to get testing data
+    arrow_strings: bool, default False
+        Whether to get profiles as 'pyarrow' strings
 
     Returns
     -------
     tuple[pandas.Series | pandas.DataFrame, pandas.Series] \
     | tuple[pandas.Series | pandas.DataFrame, pandas.Series, pandas.Series | pandas.DataFrame, pandas.Series]
-        Training features and target, optionally testing features and target
+        Training features and target, optionally testing features and target, with the data types of schema (but
+        double-precision floats, see widen_floats)
     """
 
-    # read relevant training data from the adjusted file
-    data = pandas.read_csv('adjusted_data.csv')
+    # names of the columns to read
+    columns = [features_names] if isinstance(features_names, str) else list(features_names)
+    columns = list(dict.fromkeys([*columns, target_name]))
+
+    # read relevant training data from the adjusted file using read_adjusted
+    # (in double precision, single precision being for storage only, using widen_floats)
+    data = widen_floats(apply_schema(read_adjusted('adjusted_data.csv', columns), arrow_strings))
     train_features = data[features_names]
     train_target = data[target_name]
     # drop rows with missing values using drop_missing
@@ -187,8 +723,8 @@ def get_data(features_names: str | list[str], target_name: str, test: bool = Tru
 
     if test:
 
-        # read relevant testing data from the adjusted file
-        test_data = pandas.read_csv('adjusted_test_data.csv')
+        # read relevant testing data from the adjusted file using read_adjusted
+        test_data = widen_floats(apply_schema(read_adjusted('adjusted_test_data.csv', columns), arrow_strings))
         test_features = test_data[features_names]
         test_target = test_data[target_name]
         # drop rows with missing values using drop_missing
@@ -0,0 +1,246 @@
+"""
+Module for encoding labels with fixed integer ids
+
+Keeps a registry of encoders ({name: labels}, the id of a label being its position), persists it to a json file,
+encodes and decodes whole columns at once through categorical codes
+
+Requires installation of 'pandas'
+
+Functions
+---------
+load_encoders
+    Reads the registry of encoders
+save_encoders
+    Writes the registry of encoders
+get_labels
+    Gets the labels of an encoder
+register_labels
+    Adds new labels to an encoder, with the next free ids
+get_map
+    Gets the {label: id} map of an encoder
+encode
+    Encodes labels to their ids
+decode
+    Decodes ids to their labels
+
+Notes
+-----
+Ids never change once assigned, new labels are appended, so that models fitted earlier remain valid
+Encoders missing from the json file start with their default labels (see default_encoders)
+"""
+
+import contextlib
+import json
+import os
+import pandas
+
+try:
+    import fcntl
+except ImportError:
+    # not available on Windows
+    fcntl = None
+
+# default name of the json file with the registry
+encoders_file_name = 'encoders.json'
+
+# {name: labels} dictionary of the encoders known in advance
+# (so that the ids of the known labels do not depend on which analysis registers them first)
+default_encoders = {
+    'origins': ['Africa', 'Asia & Oceania', 'Mexico & Central America', 'South America'],
+    'processes': ['washed', 'natural', 'pulped natural', 'anaerobic', 'wet hulled', 'honey', 'red honey',
+                  'semi-washed', 'decaf']
+}
+
+
+def load_encoders(file_name: str = encoders_file_name) -> dict[str, list[str]]:
+    """
+    Reads the registry of encoders
+
+    Parameters
+    ----------
+    file_name: str, default encoders_file_name
+        Name of the json file with the registry
+
+    Returns
+    -------
+    dict[str, list[str]]
+        {name: labels} dictionary, default_encoders updated with the saved encoders
+    """
+
+    encoders = {name: list(labels) for name, labels in default_encoders.items()}
+    if os.path.exists(file_name):
+        with open(file_name) as encoders_file:
+            encoders.update(json.load(encoders_file))
+
+    return encoders
+
+
+def save_encoders(encoders: dict[str, list[str]], file_name: str = encoders_file_name) -> None:
+    """
+    Writes the registry of encoders
+
+    Parameters
+    ----------
+    encoders: dict[str, list[str]]
+        {name: labels} dictionary
+    file_name: str, default encoders_file_name
+        Name of the json file with the registry
+
+    Returns
+    -------
+    None
+    """
+
+    # write a temporary file first, so that concurrent readers never see a partial registry
+    temporary_file_name = f'{file_name}.{os.getpid()}.tmp'
+    with open(temporary_file_name, 'w') as encoders_file:
+        json.dump(encoders, encoders_file, indent=4)
+    os.replace(temporary_file_name, file_name)
+
+
+def get_labels(name: str, file_name: str = encoders_file_name) -> list[str]:
+    """
+    Gets the labels of an encoder
+
+    Parameters
+    ----------
+    name: str
+        Name of the encoder, e.g. 'origins' or 'processes'
+    file_name: str, default encoders_file_name
+        Name of the json file with the registry
+
+    Returns
+    -------
+    list[str]
+        Labels, ordered by id
+    """
+
+    encoders = load_encoders(file_name)
+    if name not in encoders:
+        raise KeyError(f'No encoder {name!r} in {file_name!r}')
+
+    return encoders[name]
+
+
+def register_labels(name: str, labels, file_name: str = encoders_file_name) -> list[str]:
+    """
+    Adds new labels to an encoder, with the next free ids
+
+    Parameters
+    ----------
+    name: str
+        Name of the encoder, created if it does not exist
+    labels
+        Labels to register (in the order of their new ids), the known ones are skipped
+    file_name: str, default encoders_file_name
+        Name of the json file with the registry
+
+    Returns
+    -------
+    list[str]
+        All the labels of the encoder, ordered by id
+
+    Notes
+    -----
+    The registry is written only if new labels have been added
+    """
+
+    # skip locking if all the labels are known
+    known_labels = get_labels(name, file_name) if name in load_encoders(file_name) else []
+    if set(labels) <= set(known_labels):
+        return known_labels
+
+    # (lock the registry, so that analyses run in parallel by 'runner.py' do not assign the same ids twice)
+    with open(f'{file_name}.lock', 'w') as lock_file, contextlib.ExitStack() as lock:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            lock.callback(fcntl.flock, lock_file, fcntl.LOCK_UN)
+
+        encoders = load_encoders(file_name)
+        known_labels = encoders.setdefault(name, [])
+        known = set(known_labels)
+        new_labels = [label for label in dict.fromkeys(labels) if label not in known]
+
+        if new_labels:
+            known_labels.extend(new_labels)
+            save_encoders(encoders, file_name)
+
+    return known_labels
+
+
+def get_map(name: str, file_name: str = encoders_file_name) -> dict[str, int]:
+    """
+    Gets the {label: id} map of an encoder
+
+    Parameters
+    ----------
+    name: str
+        Name of the encoder
+    file_name: str, default encoders_file_name
+        Name of the json file with the registry
+
+    Returns
+    -------
+    dict[str, int]
+        {label: id} map
+    """
+
+    return {label: label_id for label_id, label in enumerate(get_labels(name, file_name))}
+
+
+def encode(name: str, labels: pandas.Series, errors: str = 'flag', file_name: str = encoders_file_name) \
+        -> pandas.Series:
+    """
+    Encodes labels to their ids
+
+    Parameters
+    ----------
+    name: str
+        Name of the encoder
+    labels: pandas.Series
+        Labels to encode, strings or categories
+    errors: str, default 'flag'
+        'flag' (encode unseen labels as -1) or 'raise' (raise Value Error on unseen labels)
+    file_name: str, default encoders_file_name
+        Name of the json file with the registry
+
+    Returns
+    -------
+    pandas.Series
+        Ids, with the index of labels, -1 for missing and unseen labels
+    """
+
+    # (categories are recoded once, not label by label)
+    codes = pandas.Series(pandas.Categorical(labels, categories=get_labels(name, file_name)).codes,
+                          index=labels.index, name=labels.name, dtype='int64')
+
+    if errors == 'raise':
+        unseen = labels[(codes == -1) & labels.notna()]
+        if len(unseen):
+            raise ValueError(f'Labels unseen by encoder {name!r}: {sorted(unseen.unique())}')
+
+    return codes
+
+
+def decode(name: str, codes: pandas.Series, file_name: str = encoders_file_name) -> pandas.Series:
+    """
+    Decodes ids to their labels
+
+    Parameters
+    ----------
+    name: str
+        Name of the encoder
+    codes: pandas.Series
+        Ids, -1 or NaN for missing labels
+    file_name: str, default encoders_file_name
+        Name of the json file with the registry
+
+    Returns
+    -------
+    pandas.Series
+        Labels as categories, with the index of codes, NaNs for missing labels
+    """
+
+    return pandas.Series(pandas.Categorical.from_codes(codes.fillna(-1).astype('int64'),
+                                                       categories=get_labels(name, file_name)),
+                         index=codes.index, name=codes.name)
@@ -0,0 +1,187 @@
+"""
+Module for measuring the stages of the project
+
+Records the wall time, CPU time, peak memory and number of rows of named stages, exports them to json files
+
+Functions
+---------
+stage
+    Measures a named stage
+measured_stage
+    Measures a named stage, regardless of whether measuring is enabled
+peak_rss
+    Gets the peak resident set size of the process
+export_json
+    Writes the recorded stages to a json file
+export_chrome_trace
+    Writes the recorded stages to a Chrome trace file
+export_on_exit
+    Writes the recorded stages to the file named by the environment variable
+
+Notes
+-----
+Disabled unless the environment variable GREENCOFFEE_PROFILE is set to the name of the output file, e.g.
+GREENCOFFEE_PROFILE=stages.json python main.py (or stages.trace.json, for chrome://tracing and Perfetto)
+When disabled, stage returns a no-op context manager, so that instrumented code runs at virtually full speed
+"""
+
+import atexit
+import contextlib
+import json
+import os
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+# name of the output file, the stages are not recorded if None
+output_file_name = os.environ.get('GREENCOFFEE_PROFILE') or None
+enabled = output_file_name is not None
+
+# recorded stages
+records = []
+
+
+def stage(name: str, rows: int | None = None) -> contextlib.AbstractContextManager[dict]:
+    """
+    Measures a named stage
+
+    Parameters
+    ----------
+    name: str
+        Name of the stage, e.g. 'data.get_data'
+    rows: int | None, default None
+        Number of rows processed by the stage, can also be set later through the 'rows' key of the yielded dictionary
+
+    Returns
+    -------
+    contextlib.AbstractContextManager[dict]
+        Context manager yielding the record of the stage, which is appended to records on exit
+
+    Notes
+    -----
+    Each record contains 'name', 'rows', 'start' (time since the epoch), 'wall_seconds', 'cpu_seconds',
+    'peak_rss_mb' (the peak of the whole process at the end of the stage), 'pid' and 'thread'
+    """
+
+    if not enabled:
+        return contextlib.nullcontext({})
+
+    return measured_stage(name, rows)
+
+
+@contextlib.contextmanager
+def measured_stage(name: str, rows: int | None = None):
+    """
+    Measures a named stage, regardless of whether measuring is enabled
+
+    Parameters
+    ----------
+    name: str
+        Name of the stage
+    rows: int | None, default None
+        Number of rows processed by the stage
+
+    Returns
+    -------
+    contextlib.AbstractContextManager[dict]
+        Context manager yielding the record of the stage, which is appended to records on exit
+    """
+
+    record = {'name': name, 'rows': rows}
+    start = time.time()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield record
+    finally:
+        record.update({'start': start,
+                       'wall_seconds': time.perf_counter() - wall_start,
+                       'cpu_seconds': time.process_time() - cpu_start,
+                       'peak_rss_mb': peak_rss(),
+                       'pid': os.getpid(),
+                       'thread': threading.get_ident()})
+        records.append(record)
+
+
+def peak_rss() -> float | None:
+    """
+    Gets the peak resident set size of the process
+
+    Returns
+    -------
+    float | None
+        Peak resident set size in MB, None if it is not available
+    """
+
+    if resource is None:
+        return None
+
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+
+
+def export_json(file_name: str) -> None:
+    """
+    Writes the recorded stages to a json file
+
+    Parameters
+    ----------
+    file_name: str
+        Name of the json file
+
+    Returns
+    -------
+    None
+    """
+
+    with open(file_name, 'w') as json_file:
+        json.dump(records, json_file, indent=4)
+
+
+def export_chrome_trace(file_name: str) -> None:
+    """
+    Writes the recorded stages to a Chrome trace file
+
+    Parameters
+    ----------
+    file_name: str
+        Name of the trace file
+
+    Returns
+    -------
+    None
+    """
+
+    # complete events, with times in microseconds
+    events = [{'name': record['name'], 'ph': 'X', 'ts': record['start'] * 10 ** 6,
+               'dur': record['wall_seconds'] * 10 ** 6, 'pid': record['pid'], 'tid': record['thread'],
+               'args': {'rows': record['rows'], 'cpu_seconds': record['cpu_seconds'],
+                        'peak_rss_mb': record['peak_rss_mb']}}
+              for record in records]
+
+    with open(file_name, 'w') as trace_file:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace_file)
+
+
+def export_on_exit() -> None:
+    """
+    Writes the recorded stages to the file named by the environment variable
+
+    Returns
+    -------
+    None
+    """
+
+    if output_file_name.endswith('.trace.json'):
+        export_chrome_trace(output_file_name)
+    else:
+        export_json(output_file_name)
+
+
+if enabled:
+    atexit.register(export_on_exit)
@@ -3,88 +3,343 @@ Main script of the project
 
 Transforms 'data.csv' and 'test_data.csv' using 'data.py'
 Runs 'price_score.py', 'origin_weight_price.py', 'origin_profile.py', 'process_score_price.py', 'process_profile.py'
+(for a parallel run without pop-up plots, see 'runner.py')
+Provides sub-commands for single steps: adjusting and de-duplicating the data, training one analysis, predicting with a
+saved model
 
 Requires installation of 'pandas', 'matplotlib', 'scikit-learn', 'nltk', 'scipy'
+
+Functions
+---------
+adjust
+    Adjusts data files
+dedupe
+    Drops data present in the training set from the testing set
+train
+    Runs a single analysis
+predict
+    Predicts the targets of new coffees with a saved model
+run_all
+    Adjusts the data files and runs all the analyses
+main
+    Parses the command line and runs the chosen sub-command
+
+Notes
+-----
+Usage: python main.py [adjust [file ...] [--into merged_file [--workers n]]
+                       | dedupe [--keys key ...] [--normalize] [--similarity threshold [--report report_file]]
+                       | train experiment [--headless] [--figures-dir dir] [--register] [--scaled]
+                       | predict model rows_file [--version version]]
+(without a sub-command, adjusts the data files and runs all the analyses, see run_all)
+Modules are imported by the sub-commands that need them, e.g. 'adjust' and 'dedupe' import 'data.py' (and 'pandas')
+only, 'predict' does not import the analyses nor 'matplotlib'
+For the import times of a sub-command, run e.g. python -X importtime main.py adjust 2> importtime.txt
 """
 
-import data
+import argparse
+import importlib
+import json
+import sys
+
+
+def adjust(file_names: list[str] | None = None, chunk_size: int | None = None, output_file_name: str | None = None,
+           max_workers: int | None = None) -> None:
+    """
+    Adjusts data files
+
+    Parameters
+    ----------
+    file_names: list[str] | None, default None
+        Names of the csv data files, ['data.csv', 'test_data.csv'] if None (directories or glob patterns if
+        output_file_name is given)
+    chunk_size: int | None, default None
+        Number of rows to adjust at a time, the whole file at once if None
+    output_file_name: str | None, default None
+        Name of the adjusted csv file to merge all the files into, each file is adjusted separately if None
+    max_workers: int | None, default None
+        Number of worker processes adjusting the files to merge, the number of processors if None
+
+    Returns
+    -------
+    None
+    """
+
+    import data
+
+    # merge many data files into one adjusted file using 'data.py'
+    if output_file_name is not None:
+        adjusted_files = data.adjust_files(file_names or ['data.csv'], output_file_name, max_workers)
+        print(f"Adjusted {len(adjusted_files['adjusted'])} files, skipped {len(adjusted_files['skipped'])} unchanged "
+              f"files")
+        return
+
+    # transform data files using 'data.py'
+    for file_name in file_names or ['data.csv', 'test_data.csv']:
+        data.adjust_data(file_name, chunk_size)
+
+
+def dedupe(keys: list[str] | None = None, normalize: bool = False, threshold: float | None = None,
+           report_file_name: str | None = None) -> None:
+    """
+    Drops data present in the training set from the testing set
+
+    Parameters
+    ----------
+    keys: list[str] | None, default None
+        Names of the columns identifying a sample, ['Coffee'] if None
+    normalize: bool, default False
+        Whether to collapse whitespace and ignore case in text keys before comparing them
+    threshold: float | None, default None
+        Lowest similarity of near-duplicate samples to drop too, only exact duplicates if None
+    report_file_name: str | None, default None
+        Name of the csv file for the report of the near-duplicate pairs, not written if None
+
+    Returns
+    -------
+    None
+    """
+
+    import data
+
+    # drop duplicates from the adjusted testing data using 'data.py'
+    removed_data, pairs = data.drop_duplicates('adjusted_data.csv', 'adjusted_test_data.csv', keys or 'Coffee',
+                                               normalize, threshold, report_file_name)
+    if threshold is not None:
+        print(f'Found {len(pairs)} near-duplicate pairs')
+    print(f'Removed {len(removed_data)} duplicated samples from the testing data')
+
+
+def train(experiment: str, show: bool = True, figures_dir: str = '.', register: bool = False, scaled: bool = False) \
+        -> dict[str, dict]:
+    """
+    Runs a single analysis
+
+    Parameters
+    ----------
+    experiment: str
+        Name of the analysis script, one of runner.experiments
+    show: bool, default True
+        Whether to show the plots, otherwise they are saved to figures_dir with the non-interactive backend
+    figures_dir: str, default '.'
+        Directory for the saved plots
+    register: bool, default False
+        Whether to save the fitted models and their preprocessing to the registry using 'models.py'
+    scaled: bool, default False
+        Whether 'process_score_price.py' classifies with the persisted spatial index of standardized features
+
+    Returns
+    -------
+    dict[str, dict]
+        Results of the analysis
+    """
+
+    if not show:
+        import runner
+        runner.use_headless_backend()
+
+    # import only the chosen analysis
+    # (only 'process_score_price.py' has a scaled mode)
+    options = {'scaled': scaled} if experiment == 'process_score_price' else {}
+    return importlib.import_module(experiment).run(show=show, figures_dir=figures_dir, register=register, **options)
+
+
+def predict(name: str, rows_file_name: str, version: int | None = None) -> list:
+    """
+    Predicts the targets of new coffees with a saved model
+
+    Parameters
+    ----------
+    name: str
+        Name of the model in the registry
+    rows_file_name: str
+        Name of a json file with a list of {column: value} rows (or a {"rows": [...]} object), '-' for the standard
+        input
+    version: int | None, default None
+        Version of the model, the latest one if None
+
+    Returns
+    -------
+    list
+        Predicted targets
+    """
+
+    import service
+
+    # read the new coffees
+    if rows_file_name == '-':
+        rows = json.load(sys.stdin)
+    else:
+        with open(rows_file_name) as rows_file:
+            rows = json.load(rows_file)
+    if isinstance(rows, dict):
+        rows = rows['rows']
+
+    # predict using 'service.py'
+    predictions, _ = service.predict(name, rows, version)
+    print(json.dumps(predictions))
+
+    return predictions
+
+
+def run_all() -> None:
+    """
+    Adjusts the data files and runs all the analyses
+
+    Returns
+    -------
+    None
+    """
+
+    import data
+
+    # transform data files using 'data.py'
+    data.adjust_data('data.csv')
+    data.adjust_data('test_data.csv')
+    data.drop_duplicates('adjusted_data.csv', 'adjusted_test_data.csv')
+
+    import price_score
+    price_score.run()
+
+    # output of 'price_score.py'
+    '''
+    Investigating the dependence of green coffee price on its score...
+
+    Model obtained with Linear Regression: y = 6x + -459
+    Accuracy (coefficient of determination): R2 = 0.48
+    '''
+    # pop-up plot: 'price_score.png'
+
+    import origin_weight_price
+    origin_weight_price.run()
+
+    # output of 'origin_weight_price.py'
+    '''
+    Classifying green coffee origin based on its price and weight...
+
+    {'Africa': 0, 'Asia & Oceania': 1, 'Mexico & Central America': 2, 'South America': 3}
+
+    True origins: [3. 3. 3. 3. 3. 3. 2. 2. 2. 2. 0. 0. 0. 2. 2. 2. 2. 2. 2. 1. 1. 2. 2. 2.
+                   2. 2. 2. 2. 2. 2. 2. 2. 0. 0. 0. 0. 0. 0. 0. 0.]
+    Origins predicted with Decision Trees: [3. 3. 3. 3. 3. 3. 2. 1. 2. 2. 0. 0. 0. 2. 2. 2. 2. 2. 2. 0. 3. 2. 2. 2.
+                                            2. 2. 2. 2. 2. 2. 2. 2. 0. 0. 0. 0. 0. 0. 1. 0.]
+    Accuracy (mean accuracy): 0.90
+    '''
+    # pop-up plots: 'origin_weight_price.png', 'origin_weight_price_tree.png'
+
+    import origin_profile
+    origin_profile.run()
+
+    # output of 'origin_profile.py'
+    '''
+    Classifying green coffee origin based on its sensory profile...
+
+    {'Africa': 0, 'Asia & Oceania': 1, 'Mexico & Central America': 2, 'South America': 3}
+
+    True origins: [3 3 3 2 2 2 2 1 1 2 2 0 0 0 0 0]
+    Origins predicted with Multinomial Naive Bayes: [3 3 3 0 2 2 3 2 3 2 3 0 0 0 0 3]
+    Accuracy (mean accuracy): 0.62
+
+    True origins: [3 3 3 2 2 2 2 1 1 2 2 0 0 0 0 0]
+    Origins predicted with Complement Naive Bayes: [3 3 2 2 2 2 3 2 1 2 3 0 0 0 0 1]
+    Accuracy (mean accuracy): 0.69
+    '''
 
-# transform data files using 'data.py'
-data.adjust_data('data.csv')
-data.adjust_data('test_data.csv')
-data.drop_duplicates('adjusted_data.csv', 'adjusted_test_data.csv')
+    import process_score_price
+    process_score_price.run()
 
-import price_score
+    # output of 'process_score_price.py'
+    '''
+    Classifying green coffee processing method based on its price and score...
 
-# output of 'price_score.py'
-'''
-Investigating the dependence of green coffee price on its score...
+    {'washed': 0, 'natural': 1, 'pulped natural': 2, 'anaerobic': 3}
 
-Model obtained with Linear Regression: y = 6x + -459
-Accuracy (coefficient of determination): R2 = 0.48
-'''
-# pop-up plot: 'price_score.png'
+    True processing methods: [1 0 0 0 0 1 0 0 0]
+    Processing methods predicted with k-Nearest Neighbors: [1. 0. 0. 0. 1. 0. 0. 1. 0.]
+    Accuracy (mean accuracy): 0.67
 
-import origin_weight_price
+    True processing methods: [1 0 0 0 0 1 0 0 0]
+    Processing methods predicted with Fixed-Radius Near Neighbors: [1. 0. 0. 1. 1. 0. 0. 0. 0.]
+    Accuracy (mean accuracy): 0.67
+    '''
+    # pop-up plot: 'process_score_price.png'
 
-# output of 'origin_weight_price.py'
-'''
-Classifying green coffee origin based on its price and weight...
+    import process_profile
+    process_profile.run()
 
-{'Africa': 0, 'Asia & Oceania': 1, 'Mexico & Central America': 2, 'South America': 3}
+    # output of 'process_profile.py'
+    '''
+    Classifying green coffee processing method based on its sensory profile...
 
-True origins: [3. 3. 3. 3. 3. 3. 2. 0. 0. 0. 2. 2. 2. 2. 2. 2. 1. 1. 2. 2. 2. 2. 2. 2. 2. 2. 2.
-               2. 2. 0. 0. 0. 0. 0. 0. 0. 0.]
-Origins predicted with Decision Trees: [3. 3. 3. 3. 3. 3. 2. 0. 0. 0. 2. 2. 3. 2. 2. 3. 0. 3. 2. 2. 2. 3. 2. 2. 3. 2. 2.
-                                        2. 2. 0. 0. 0. 0. 0. 0. 1. 0.]
-Accuracy (mean accuracy): 0.81
-'''
-# pop-up plots: 'origin_weight_price.png', 'origin_weight_price_tree.png'
+    {'washed': 0, 'natural': 1, 'pulped natural': 2, 'anaerobic': 3, 'wet hulled': 4}
 
-import origin_profile
+    True processing methods: [1. 0. 0. 1. 0. 0. 0. 0. 0. 0. 0. 1. 0. 0. 0.]
+    Processing methods predicted with Support Vector Machines: [0. 0. 0. 0. 0. 0. 1. 0. 0. 0. 1. 0. 0. 0. 0.]
+    Accuracy (mean accuracy): 0.67
+    '''
 
-# output of 'origin_profile.py'
-'''
-Classifying green coffee origin based on its sensory profile...
 
-{'Africa': 0, 'Asia & Oceania': 1, 'Mexico & Central America': 2, 'South America': 3}
+def main(arguments: list[str] | None = None) -> None:
+    """
+    Parses the command line and runs the chosen sub-command
 
-True origins: [3 3 3 2 2 2 2 1 1 2 2 0 0 0 0 0]
-Origins predicted with Multinomial Naive Bayes: [3. 3. 3. 0. 2. 3. 3. 2. 3. 2. 3. 0. 0. 0. 0. 3.]
-Accuracy (mean accuracy): 0.56
+    Parameters
+    ----------
+    arguments: list[str] | None, default None
+        Command line arguments, sys.argv[1:] if None
 
-True origins: [3 3 3 2 2 2 2 1 1 2 2 0 0 0 0 0]
-Origins predicted with Complement Naive Bayes: [3. 2. 2. 2. 2. 2. 3. 2. 1. 2. 3. 0. 0. 0. 0. 1.]
-Accuracy (mean accuracy): 0.62
-'''
+    Returns
+    -------
+    None
+    """
 
-import process_score_price
+    parser = argparse.ArgumentParser(description='Green coffee analyses')
+    sub_commands = parser.add_subparsers(dest='command')
 
-# output of 'process_score_price.py'
-'''
-Classifying green coffee processing method based on its price and score...
+    adjust_parser = sub_commands.add_parser('adjust', help='adjust data files')
+    adjust_parser.add_argument('file_names', nargs='*', help="csv data files ('data.csv', 'test_data.csv' if none)")
+    adjust_parser.add_argument('--chunk-size', type=int, help='number of rows to adjust at a time')
+    adjust_parser.add_argument('--into', dest='output_file_name',
+                               help='merge the files (directories or glob patterns) into one adjusted file')
+    adjust_parser.add_argument('--workers', type=int, dest='max_workers', help='number of processes merging files')
 
-{'washed': 0, 'natural': 1, 'pulped natural': 2, 'anaerobic': 3}
+    dedupe_parser = sub_commands.add_parser('dedupe', help='drop training samples from the testing data')
+    dedupe_parser.add_argument('--keys', nargs='+', help="columns identifying a sample ('Coffee' by default)")
+    dedupe_parser.add_argument('--normalize', action='store_true', help='ignore whitespace and case in text keys')
+    dedupe_parser.add_argument('--similarity', type=float, dest='threshold',
+                               help='drop near duplicates with at least this similarity (between 0 and 1) too')
+    dedupe_parser.add_argument('--report', dest='report_file_name', help='csv file for the near-duplicate pairs')
 
-True processing methods: [1 0 0 0 0 1 0 0 0]
-Processing methods predicted with k-Nearest Neighbors: [1. 0. 0. 0. 1. 0. 0. 1. 0.]
-Accuracy (mean accuracy): 0.67
+    # ('runner.py' imports no analyses nor 'matplotlib' by itself)
+    import runner
+    train_parser = sub_commands.add_parser('train', help='run a single analysis')
+    train_parser.add_argument('experiment', choices=runner.experiments)
+    train_parser.add_argument('--headless', action='store_true', help='save the plots instead of showing them')
+    train_parser.add_argument('--figures-dir', default='.', help='directory for the saved plots')
+    train_parser.add_argument('--register', action='store_true', help='save the fitted models to the registry')
+    train_parser.add_argument('--scaled', action='store_true',
+                              help='classify with the spatial index of standardized features (process_score_price)')
 
-True processing methods: [1 0 0 0 0 1 0 0 0]
-Processing methods predicted with Fixed-Radius Near Neighbors: [1. 0. 0. 1. 1. 0. 0. 0. 0.]
-Accuracy (mean accuracy): 0.67
-'''
-# pop-up plot: 'process_score_price.png'
+    predict_parser = sub_commands.add_parser('predict', help='predict with a saved model')
+    predict_parser.add_argument('model', help='name of the model in the registry')
+    predict_parser.add_argument('rows_file_name', help="json file with the new coffees, '-' for the standard input")
+    predict_parser.add_argument('--version', type=int, help='version of the model (the latest by default)')
 
-import process_profile
+    arguments = parser.parse_args(arguments)
 
-# output of 'process_profile.py'
-'''
-Classifying green coffee processing method based on its sensory profile...
+    if arguments.command == 'adjust':
+        adjust(arguments.file_names, arguments.chunk_size, arguments.output_file_name, arguments.max_workers)
+    elif arguments.command == 'dedupe':
+        dedupe(arguments.keys, arguments.normalize, arguments.threshold, arguments.report_file_name)
+    elif arguments.command == 'train':
+        if arguments.scaled and arguments.experiment != 'process_score_price':
+            parser.error('--scaled applies to process_score_price only')
+        train(arguments.experiment, not arguments.headless, arguments.figures_dir, arguments.register,
+              arguments.scaled)
+    elif arguments.command == 'predict':
+        predict(arguments.model, arguments.rows_file_name, arguments.version)
+    else:
+        run_all()
 
-{'washed': 0, 'natural': 1, 'pulped natural': 2, 'wet hulled': 3, 'anaerobic': 4}
 
-True processing methods: [1. 0. 0. 1. 0. 0. 0. 0. 0. 0. 0. 1. 0. 0. 0.]
-Processing methods predicted with Support Vector Machines: [0. 0. 0. 0. 0. 0. 1. 0. 0. 0. 1. 0. 0. 0. 0.]
-Accuracy (mean accuracy): 0.67
-'''
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+"""
+Module for finding near-duplicate texts with MinHash and Locality-Sensitive Hashing
+
+Shingles texts into character n-grams of their words, summarizes the shingles with MinHash signatures, finds candidate
+pairs sharing a band of their signatures, then keeps the pairs with a high enough Jaccard similarity
+
+Requires installation of 'numpy'
+
+Functions
+---------
+shingle
+    Splits a text into hashed character n-grams of its words
+compute_signatures
+    Computes MinHash signatures of sets of shingles
+choose_bands
+    Chooses the number of bands of the signatures for a similarity threshold
+candidate_pairs
+    Finds pairs of texts sharing at least one band of their signatures
+jaccard
+    Computes the Jaccard similarity of two sets of shingles
+find_near_duplicates
+    Finds pairs of similar texts between two collections
+
+Notes
+-----
+Shingles are taken within words, so that extra whitespace and punctuation, changed case and reordered words do not
+change them
+Finding the pairs takes time proportional to the number of texts and candidate pairs, rather than of all the pairs
+"""
+
+import re
+import zlib
+import numpy
+
+# value of the signatures of texts without shingles
+empty = 2 ** 32 - 1
+
+
+def shingle(text: str, k: int = 3) -> set[int]:
+    """
+    Splits a text into hashed character n-grams of its words
+
+    Parameters
+    ----------
+    text: str
+        Text, e.g. a coffee name
+    k: int, default 3
+        Number of characters of each shingle
+
+    Returns
+    -------
+    set[int]
+        Hashes of the shingles (of each word padded with spaces, so that short words have shingles too)
+    """
+
+    shingles = set()
+    for word in re.findall(r'\w+', str(text).lower()):
+        word = f' {word} '
+        for start in range(max(len(word) - k + 1, 1)):
+            # (crc32 rather than hash, which differs between processes)
+            shingles.add(zlib.crc32(word[start:start + k].encode()))
+
+    return shingles
+
+
+def compute_signatures(shingle_sets: list[set[int]], n_hashes: int = 128, seed: int = 0,
+                       batch_size: int = 4096) -> numpy.ndarray:
+    """
+    Computes MinHash signatures of sets of shingles
+
+    Parameters
+    ----------
+    shingle_sets: list[set[int]]
+        Sets of shingles, as returned by shingle
+    n_hashes: int, default 128
+        Number of hash functions (length of the signatures)
+    seed: int, default 0
+        Seed of the random hash functions
+    batch_size: int, default 4096
+        Number of sets processed at a time (each shingle of a batch is hashed n_hashes times at once)
+
+    Returns
+    -------
+    numpy.ndarray
+        Signatures, a row for each set (the minimum of each hash function over the shingles of the set), rows of empty
+        sets are filled with empty
+
+    Notes
+    -----
+    Uses multiply-shift hash functions, the high 32 bits of a * shingle + b (mod 2 ** 64) with random odd a, which need
+    no division
+    """
+
+    # random hash functions
+    rng = numpy.random.default_rng(seed)
+    a = rng.integers(0, 2 ** 63, n_hashes, dtype=numpy.uint64) * numpy.uint64(2) + numpy.uint64(1)
+    b = rng.integers(0, 2 ** 63, n_hashes, dtype=numpy.uint64)
+
+    signatures = numpy.full((len(shingle_sets), n_hashes), empty, dtype=numpy.uint32)
+    for start in range(0, len(shingle_sets), batch_size):
+        batch = shingle_sets[start:start + batch_size]
+        sizes = numpy.array([len(shingles) for shingles in batch])
+        filled = numpy.flatnonzero(sizes)
+        if not len(filled):
+            continue
+        shingles = numpy.fromiter((value for shingles in batch for value in shingles), dtype=numpy.uint64,
+                                  count=sizes.sum())
+        # hash every shingle with every function, then take the minimum over the shingles of each set
+        hashes = ((shingles[:, numpy.newaxis] * a + b) >> numpy.uint64(32)).astype(numpy.uint32)
+        offsets = numpy.concatenate([[0], sizes.cumsum()[:-1]])
+        signatures[start + filled] = numpy.minimum.reduceat(hashes, offsets[filled], axis=0)
+
+    return signatures
+
+
+def choose_bands(n_hashes: int, threshold: float, recall: float = 0.99) -> int:
+    """
+    Chooses the number of bands of the signatures for a similarity threshold
+
+    Parameters
+    ----------
+    n_hashes: int
+        Length of the signatures
+    threshold: float
+        Lowest Jaccard similarity of the pairs to find
+    recall: float, default 0.99
+        Lowest probability of a pair with threshold similarity becoming a candidate
+
+    Returns
+    -------
+    int
+        Number of bands, a divisor of n_hashes
+
+    Notes
+    -----
+    A pair with similarity s becomes a candidate with probability 1 - (1 - s ** rows) ** bands, chooses the fewest
+    bands (the longest ones, giving the fewest candidates) which still reach the recall at the threshold
+    """
+
+    for bands in range(1, n_hashes + 1):
+        if n_hashes % bands == 0 and 1 - (1 - threshold ** (n_hashes // bands)) ** bands >= recall:
+            return bands
+
+    return n_hashes
+
+
+def candidate_pairs(signatures: numpy.ndarray, other_signatures: numpy.ndarray, bands: int) \
+        -> tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Finds pairs of texts sharing at least one band of their signatures
+
+    Parameters
+    ----------
+    signatures: numpy.ndarray
+        Signatures of the texts, as returned by compute_signatures
+    other_signatures: numpy.ndarray
+        Signatures of the other texts
+    bands: int
+        Number of bands to split the signatures into
+
+    Returns
+    -------
+    tuple[numpy.ndarray, numpy.ndarray]
+        Indices of the texts and of the other texts of each candidate pair, without repetitions
+    """
+
+    rows = signatures.shape[1] // bands
+    # random odd multipliers combining the values of a band into one key
+    multipliers = numpy.random.default_rng(0).integers(0, 2 ** 63, rows, dtype=numpy.uint64) * numpy.uint64(2) \
+        + numpy.uint64(1)
+
+    pairs = []
+    for band in range(bands):
+        # key each band by its values (as a hash, so that identical bands share a key)
+        keys = signatures[:, band * rows:(band + 1) * rows] @ multipliers
+        other_keys = other_signatures[:, band * rows:(band + 1) * rows] @ multipliers
+
+        # pair each text with the other texts with the same key
+        order = numpy.argsort(other_keys)
+        sorted_keys = other_keys[order]
+        starts = numpy.searchsorted(sorted_keys, keys, 'left')
+        counts = numpy.searchsorted(sorted_keys, keys, 'right') - starts
+        # (skipping texts without shingles)
+        counts[signatures[:, 0] == empty] = 0
+        indices = numpy.repeat(numpy.arange(len(signatures)), counts)
+        positions = numpy.arange(counts.sum()) - numpy.repeat(counts.cumsum() - counts, counts)
+        pairs.append(indices * len(other_signatures) + order[numpy.repeat(starts, counts) + positions])
+
+    pairs = numpy.unique(numpy.concatenate(pairs)) if pairs else numpy.array([], dtype=int)
+
+    return pairs // max(len(other_signatures), 1), pairs % max(len(other_signatures), 1)
+
+
+def jaccard(shingles: set[int], other_shingles: set[int]) -> float:
+    """
+    Computes the Jaccard similarity of two sets of shingles
+
+    Parameters
+    ----------
+    shingles: set[int]
+        Set of shingles
+    other_shingles: set[int]
+        Other set of shingles
+
+    Returns
+    -------
+    float
+        Size of the intersection of the sets divided by the size of their union, 0 for empty sets
+    """
+
+    union = len(shingles | other_shingles)
+
+    return len(shingles & other_shingles) / union if union else 0.0
+
+
+def find_near_duplicates(texts: list[str], other_texts: list[str], threshold: float = 0.8, k: int = 3,
+                         n_hashes: int = 128, seed: int = 0) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """
+    Finds pairs of similar texts between two collections
+
+    Parameters
+    ----------
+    texts: list[str]
+        Texts, e.g. coffee names of the testing data
+    other_texts: list[str]
+        Other texts, e.g. coffee names of the training data
+    threshold: float, default 0.8
+        Lowest Jaccard similarity of the shingles of the pairs
+    k: int, default 3
+        Number of characters of each shingle
+    n_hashes: int, default 128
+        Length of the MinHash signatures
+    seed: int, default 0
+        Seed of the random hash functions
+
+    Returns
+    -------
+    tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        Indices of the texts, indices of the other texts and similarities of the pairs, sorted by the indices
+
+    Notes
+    -----
+    Candidate pairs found with MinHash and LSH are verified with their exact similarity, so there are no false
+    positives, while pairs at the threshold are missed with a probability below 1%
+    """
+
+    shingle_sets = [shingle(text, k) for text in texts]
+    other_shingle_sets = [shingle(text, k) for text in other_texts]
+
+    # find candidate pairs using the signatures
+    indices, other_indices = candidate_pairs(compute_signatures(shingle_sets, n_hashes, seed),
+                                             compute_signatures(other_shingle_sets, n_hashes, seed),
+                                             choose_bands(n_hashes, threshold))
+
+    # verify the candidates
+    similarities = numpy.array([jaccard(shingle_sets[index], other_shingle_sets[other_index])
+                                for index, other_index in zip(indices, other_indices)], dtype=float)
+    similar = similarities >= threshold
+
+    return indices[similar], other_indices[similar], similarities[similar]
@@ -0,0 +1,144 @@
+"""
+Module for persisting fitted models along with their preprocessing
+
+Requires installation of 'scikit-learn'
+
+Functions
+---------
+save_model
+    Saves a fitted model and its preprocessing as a new version in the registry
+load_model
+    Loads a version of a model and its preprocessing from the registry
+read_model_file
+    Unpickles a saved model, once per file
+list_models
+    Lists the models in the registry along with their versions
+
+Notes
+-----
+Each version is a pickle file named 'registry_dir/model_name/version.pkl', containing a dictionary with the model, its
+preprocessing (e.g. feature names, the origins or processes map, the vectorizer), the version and its creation time
+Loaded versions are cached in memory, so they are unpickled only once per process
+"""
+
+import datetime
+import functools
+import os
+import pickle
+
+# default directory of the registry
+registry_dir = 'models'
+
+
+def save_model(name: str, model, preprocessing: dict, directory: str = registry_dir) -> int:
+    """
+    Saves a fitted model and its preprocessing as a new version in the registry
+
+    Parameters
+    ----------
+    name: str
+        Name of the model
+    model
+        Fitted model
+    preprocessing: dict
+        Everything needed to transform new data for the model, with 'features' (column name(s)) and optionally
+        'vectorizer', 'origins_map' or 'processes_map'
+    directory: str, default registry_dir
+        Directory of the registry
+
+    Returns
+    -------
+    int
+        Version of the saved model
+    """
+
+    model_dir = os.path.join(directory, name)
+    os.makedirs(model_dir, exist_ok=True)
+
+    # the next version follows the latest saved one
+    versions = list_models(directory).get(name, [])
+    version = versions[-1] + 1 if versions else 1
+
+    with open(os.path.join(model_dir, f'{version}.pkl'), 'wb') as model_file:
+        pickle.dump({'model': model, 'preprocessing': preprocessing, 'version': version,
+                     'created': datetime.datetime.now().isoformat()}, model_file)
+
+    return version
+
+
+def load_model(name: str, version: int | None = None, directory: str = registry_dir) -> dict:
+    """
+    Loads a version of a model and its preprocessing from the registry
+
+    Parameters
+    ----------
+    name: str
+        Name of the model
+    version: int | None, default None
+        Version of the model, the latest one if None
+    directory: str, default registry_dir
+        Directory of the registry
+
+    Returns
+    -------
+    dict
+        {'model': model, 'preprocessing': preprocessing, 'version': version, 'created': creation time} dictionary
+
+    Raises
+    ------
+    KeyError
+        If there is no such model or version in the registry
+    """
+
+    versions = list_models(directory).get(name, [])
+    if not versions:
+        raise KeyError(f'No model {name!r} in {directory!r}')
+    if version is None:
+        version = versions[-1]
+    if version not in versions:
+        raise KeyError(f'No version {version} of model {name!r} in {directory!r}')
+
+    return read_model_file(os.path.join(directory, name, f'{version}.pkl'))
+
+
+@functools.lru_cache(maxsize=None)
+def read_model_file(file_name: str) -> dict:
+    """
+    Unpickles a saved model, once per file
+
+    Parameters
+    ----------
+    file_name: str
+        Name of the pickle file
+
+    Returns
+    -------
+    dict
+        Contents of the file
+    """
+
+    with open(file_name, 'rb') as model_file:
+        return pickle.load(model_file)
+
+
+def list_models(directory: str = registry_dir) -> dict[str, list[int]]:
+    """
+    Lists the models in the registry along with their versions
+
+    Parameters
+    ----------
+    directory: str, default registry_dir
+        Directory of the registry
+
+    Returns
+    -------
+    dict[str, list[int]]
+        {model name: sorted versions} dictionary
+    """
+
+    if not os.path.isdir(directory):
+        return {}
+
+    return {name: sorted(int(file_name.removesuffix('.pkl'))
+                         for file_name in os.listdir(os.path.join(directory, name)) if file_name.endswith('.pkl'))
+            for name in sorted(os.listdir(directory)) if os.path.isdir(os.path.join(directory, name))}
@@ -0,0 +1,287 @@
+"""
+Module for classifying with nearest neighbors on standardized features
+
+Standardizes the features, builds a KD-tree or Ball tree once, persists it, answers batched k-nearest neighbors and
+fixed-radius queries
+
+Requires installation of 'numpy', 'scikit-learn'
+
+Functions
+---------
+build_index
+    Standardizes the training features and builds a spatial index over them
+hash_data
+    Computes a content hash of the training data
+get_index
+    Loads the persisted index of the training data, or builds and persists a new one
+scale
+    Standardizes features with the statistics of the training features
+vote
+    Finds the most frequent label among the neighbors of each sample
+predict_k
+    Predicts labels with the k nearest neighbors
+predict_radius
+    Predicts labels with the neighbors within a fixed radius
+
+Notes
+-----
+Without standardization, prices (tens to hundreds of PLN) dominate distances over scores (80 to 90)
+"""
+
+import hashlib
+import os
+import pickle
+import numpy
+from sklearn.neighbors import BallTree, KDTree
+from sklearn.preprocessing import StandardScaler
+
+
+def build_index(features: numpy.ndarray, labels: numpy.ndarray, tree: str = 'kd', leaf_size: int = 40) -> dict:
+    """
+    Standardizes the training features and builds a spatial index over them
+
+    Parameters
+    ----------
+    features: numpy.ndarray
+        Training features
+    labels: numpy.ndarray
+        Training labels
+    tree: str, default 'kd'
+        Type of the spatial index, 'kd' (KD-tree) or 'ball' (Ball tree)
+    leaf_size: int, default 40
+        Number of points in a leaf of the tree
+
+    Returns
+    -------
+    dict
+        {'scaler': fitted Standard Scaler, 'tree': spatial index, 'classes': unique labels,
+         'codes': training labels as indices of classes, 'hash': content hash of the training data} dictionary
+    """
+
+    features = numpy.asarray(features, dtype=float)
+    labels = numpy.asarray(labels)
+
+    scaler = StandardScaler().fit(features)
+    tree_type = {'kd': KDTree, 'ball': BallTree}[tree]
+    classes, codes = numpy.unique(labels, return_inverse=True)
+
+    return {'scaler': scaler, 'tree': tree_type(scaler.transform(features), leaf_size=leaf_size),
+            'classes': classes, 'codes': codes, 'hash': hash_data(features, labels)}
+
+
+def hash_data(features: numpy.ndarray, labels: numpy.ndarray) -> str:
+    """
+    Computes a content hash of the training data
+
+    Parameters
+    ----------
+    features: numpy.ndarray
+        Training features
+    labels: numpy.ndarray
+        Training labels
+
+    Returns
+    -------
+    str
+        Hexadecimal SHA-256 digest of the features and labels
+    """
+
+    # (labels of any type are hashed as strings)
+    labels = numpy.asarray(labels)
+    if labels.dtype == object:
+        labels = labels.astype(str)
+
+    data_hash = hashlib.sha256()
+    for array in (numpy.ascontiguousarray(features, dtype=float), numpy.ascontiguousarray(labels)):
+        data_hash.update(str(array.shape).encode())
+        data_hash.update(array.tobytes())
+
+    return data_hash.hexdigest()
+
+
+def get_index(features: numpy.ndarray, labels: numpy.ndarray, file_name: str, tree: str = 'kd') -> dict:
+    """
+    Loads the persisted index of the training data, or builds and persists a new one
+
+    Parameters
+    ----------
+    features: numpy.ndarray
+        Training features
+    labels: numpy.ndarray
+        Training labels
+    file_name: str
+        Name of the pickle file with the index
+    tree: str, default 'kd'
+        Type of the spatial index, 'kd' (KD-tree) or 'ball' (Ball tree)
+
+    Returns
+    -------
+    dict
+        Index returned by build_index
+
+    Notes
+    -----
+    The persisted index is rebuilt if the training data (or the type of the index) has changed
+    """
+
+    if os.path.exists(file_name):
+        with open(file_name, 'rb') as index_file:
+            index = pickle.load(index_file)
+        if index['hash'] == hash_data(features, labels) and isinstance(index['tree'], {'kd': KDTree,
+                                                                                        'ball': BallTree}[tree]):
+            return index
+
+    index = build_index(features, labels, tree)
+    with open(file_name, 'wb') as index_file:
+        pickle.dump(index, index_file)
+
+    return index
+
+
+def scale(index: dict, features: numpy.ndarray) -> numpy.ndarray:
+    """
+    Standardizes features with the statistics of the training features
+
+    Parameters
+    ----------
+    index: dict
+        Index returned by build_index
+    features: numpy.ndarray
+        Features to standardize
+
+    Returns
+    -------
+    numpy.ndarray
+        Standardized features
+    """
+
+    # (computed directly, so that empty batches are allowed)
+    return (numpy.asarray(features, dtype=float) - index['scaler'].mean_) / index['scaler'].scale_
+
+
+def vote(index: dict, samples: numpy.ndarray, neighbors: numpy.ndarray, weights: numpy.ndarray | None = None) \
+        -> numpy.ndarray:
+    """
+    Finds the most frequent label among the neighbors of each sample
+
+    Parameters
+    ----------
+    index: dict
+        Index returned by build_index
+    samples: numpy.ndarray
+        Sample number of each (sample, neighbor) pair
+    neighbors: numpy.ndarray
+        Training point number of each (sample, neighbor) pair
+    weights: numpy.ndarray | None, default None
+        Weight of each (sample, neighbor) pair, equal weights if None
+
+    Returns
+    -------
+    numpy.ndarray
+        Vote counts, with a row for each sample and a column for each class
+    """
+
+    counts = numpy.zeros((samples.max(initial=-1) + 1, len(index['classes'])))
+    numpy.add.at(counts, (samples, index['codes'][neighbors]), 1 if weights is None else weights)
+
+    return counts
+
+
+def predict_k(index: dict, features: numpy.ndarray, k: int = 5, weights: str = 'uniform',
+              batch_size: int = 10000) -> numpy.ndarray:
+    """
+    Predicts labels with the k nearest neighbors
+
+    Parameters
+    ----------
+    index: dict
+        Index returned by build_index
+    features: numpy.ndarray
+        Features of the samples to classify
+    k: int, default 5
+        Number of neighbors
+    weights: str, default 'uniform'
+        'uniform' (equal votes) or 'distance' (votes weighted by inverse distances)
+    batch_size: int, default 10000
+        Number of samples queried at a time
+
+    Returns
+    -------
+    numpy.ndarray
+        Predicted labels
+    """
+
+    features = scale(index, features)
+    k = min(k, len(index['codes']))
+
+    predictions = []
+    for start in range(0, len(features), batch_size):
+        distances, neighbors = index['tree'].query(features[start:start + batch_size], k=k)
+        samples = numpy.repeat(numpy.arange(len(neighbors)), k)
+        vote_weights = None if weights == 'uniform' else 1 / numpy.maximum(distances.ravel(), 1e-12)
+        counts = vote(index, samples, neighbors.ravel(), vote_weights)
+        predictions.append(index['classes'][counts.argmax(axis=1)])
+
+    return numpy.concatenate(predictions) if predictions else index['classes'][:0]
+
+
+def predict_radius(index: dict, features: numpy.ndarray, radius: float = 0.5, weights: str = 'uniform',
+                   outlier_label=None, batch_size: int = 10000) -> numpy.ndarray:
+    """
+    Predicts labels with the neighbors within a fixed radius
+
+    Parameters
+    ----------
+    index: dict
+        Index returned by build_index
+    features: numpy.ndarray
+        Features of the samples to classify
+    radius: float, default 0.5
+        Radius of the neighborhoods, in standard deviations of the training features
+    weights: str, default 'uniform'
+        'uniform' (equal votes) or 'distance' (votes weighted by inverse distances)
+    outlier_label: default None
+        Label of samples with no neighbors within the radius, 'most_frequent' for the most frequent training label, the
+        label of their nearest neighbor if None
+    batch_size: int, default 10000
+        Number of samples queried at a time
+
+    Returns
+    -------
+    numpy.ndarray
+        Predicted labels
+    """
+
+    features = scale(index, features)
+    if isinstance(outlier_label, str) and outlier_label == 'most_frequent':
+        outlier_label = index['classes'][numpy.bincount(index['codes']).argmax()]
+
+    predictions = []
+    for start in range(0, len(features), batch_size):
+        batch = features[start:start + batch_size]
+        neighbors, distances = index['tree'].query_radius(batch, r=radius, return_distance=True)
+
+        # count the votes of all the neighborhoods at once
+        sizes = numpy.array([len(sample_neighbors) for sample_neighbors in neighbors])
+        samples = numpy.repeat(numpy.arange(len(batch)), sizes)
+        vote_weights = None if weights == 'uniform' or not len(batch) \
+            else 1 / numpy.maximum(numpy.concatenate(distances), 1e-12)
+        counts = vote(index, samples, numpy.concatenate(neighbors).astype(int) if len(batch) else samples,
+                      vote_weights)
+        # (the outlier label may not be one of the labels, nor of their type)
+        known_outlier_label = outlier_label is None or outlier_label in index['classes']
+        batch_predictions = numpy.empty(len(batch), dtype=index['classes'].dtype if known_outlier_label else object)
+        if len(counts):
+            batch_predictions[:len(counts)] = index['classes'][counts.argmax(axis=1)]
+
+        # label empty neighborhoods instead of raising an error
+        outliers = sizes == 0
+        if outliers.any():
+            if outlier_label is None:
+                nearest = index['tree'].query(batch[outliers], k=1, return_distance=False)[:, 0]
+                batch_predictions[outliers] = index['classes'][index['codes'][nearest]]
+            else:
+                batch_predictions[outliers] = outlier_label
+        predictions.append(batch_predictions)
+
+    return numpy.concatenate(predictions) if predictions else index['classes'][:0]
@@ -2,48 +2,304 @@
 Script for classifying green coffee origin based on its sensory profile
 
 Transforms the data using 'origins.py', vectorizes the sensory profiles using 'profiles.py', creates Multinomial and 
-Complement Naive Bayes Classifiers and fits them on the training set, tests the models on the testing set
+Complement Naive Bayes Classifiers and fits them on the training set (at once, or batch by batch with hashed profiles),
+tests the models on the testing set
 
 Requires installation of 'pandas', 'nltk', 'scipy', 'scikit-learn'
+
+Functions
+---------
+run
+    Classifies green coffee origin based on its sensory profile
+update_classifiers
+    Fits the persisted classifiers on the rows appended to the training data since the last update
+hash_boundary
+    Computes a hash of the header of a csv file and of the end of its rows before an offset
+check_classifiers
+    Checks that the classifiers match classifiers retrained on the whole training data
+
+Notes
+-----
+Usage: python origin_profile.py [--incremental [--check]]
 """
 
+import hashlib
+import io
+import os
+import pickle
+import sys
+import numpy
+import pandas
 import data
+import instrument
+import models
 import origins
 import profiles
 from sklearn.naive_bayes import MultinomialNB, ComplementNB
 
-print('\nClassifying green coffee origin based on its sensory profile...')
-
-# get relevant training and testing data using 'data.py'
-train_profiles, train_origins, test_profiles, test_origins = data.get_data('Profile', 'Coffee')
-
-# transform training and testing data using 'origins.py'
-# (simplify possible origins, take into account continents rather than countries, change alphabetical data into
-#  numerical data)
-train_profiles, train_origins = origins.simplify_origins(train_profiles, train_origins)
-test_profiles, test_origins = origins.simplify_origins(test_profiles, test_origins)
-# print the mapping for reference
-print(f'\n{origins.printable_origins_map}')
-
-# vectorize the profiles using 'profiles.py'
-train_profiles_vector, test_profiles_vector = profiles.vectorize(train_profiles, test_profiles)
-
-# create Multinomial and Complement Naive Bayes Classifiers for the training data
-multinomial_classifier = MultinomialNB()
-multinomial_classifier.fit(train_profiles_vector, train_origins.to_numpy())
-complement_classifier = ComplementNB()
-complement_classifier.fit(train_profiles_vector, train_origins.to_numpy())
-
-# make predictions on the testing data
-multinomial_predicted_origins = multinomial_classifier.predict(test_profiles_vector)
-multinomial_accuracy = multinomial_classifier.score(test_profiles_vector, test_origins.to_numpy())
-complement_predicted_origins = complement_classifier.predict(test_profiles_vector)
-complement_accuracy = complement_classifier.score(test_profiles_vector, test_origins.to_numpy())
-
-# the results
-print(f'\nTrue origins: {test_origins.to_numpy()}')
-print(f'Origins predicted with Multinomial Naive Bayes: {multinomial_predicted_origins}')
-print(f'Accuracy (mean accuracy): {multinomial_accuracy:.2f}')
-print(f'\nTrue origins: {test_origins.to_numpy()}')
-print(f'Origins predicted with Complement Naive Bayes: {complement_predicted_origins}')
-print(f'Accuracy (mean accuracy): {complement_accuracy:.2f}')
+
+def run(show: bool = True, figures_dir: str = '.', batch_size: int | None = None, incremental: bool = False,
+        register: bool = False, check: bool = False) -> dict[str, dict]:
+    """
+    Classifies green coffee origin based on its sensory profile
+
+    Parameters
+    ----------
+    show: bool, default True
+        Unused, for compatibility with the other scripts (no plots)
+    figures_dir: str, default '.'
+        Unused, for compatibility with the other scripts (no plots)
+    batch_size: int | None, default None
+        Number of profiles in a training batch, vectorized with Hashing Vectorizer and fitted with partial_fit, the
+        profiles are vectorized with Count Vectorizer and fitted at once if None
+    incremental: bool, default False
+        Whether to update the persisted classifiers with new training data only, using update_classifiers
+    register: bool, default False
+        Whether to save the fitted models and their preprocessing to the registry using 'models.py'
+    check: bool, default False
+        Whether to check that the updated classifiers match classifiers retrained on the whole training data using
+        check_classifiers (if incremental), raises RuntimeError otherwise
+
+    Returns
+    -------
+    dict[str, dict]
+        {model name: {result name: result}} dictionary with the fitted models and their accuracies
+    """
+
+    print('\nClassifying green coffee origin based on its sensory profile...')
+
+    # get relevant training and testing data using 'data.py'
+    train_profiles, train_origins, test_profiles, test_origins = data.get_data('Profile', 'Coffee')
+
+    # transform training and testing data using 'origins.py'
+    # (simplify possible origins, take into account continents rather than countries, change alphabetical data into
+    #  numerical data)
+    train_profiles, train_origins = origins.simplify_origins(train_profiles, train_origins)
+    test_profiles, test_origins = origins.simplify_origins(test_profiles, test_origins)
+    # print the mapping for reference
+    print(f'\n{origins.printable_origins_map}')
+
+    # create Multinomial and Complement Naive Bayes Classifiers for the training data
+    multinomial_classifier = MultinomialNB()
+    complement_classifier = ComplementNB()
+
+    if incremental:
+
+        # update the persisted classifiers with the newly appended training data
+        classifiers = update_classifiers(batch_size=batch_size or 10000)
+        multinomial_classifier = classifiers['Multinomial Naive Bayes']
+        complement_classifier = classifiers['Complement Naive Bayes']
+        # check the updated classifiers against a full retrain
+        if check:
+            with instrument.stage('origin_profile.check_classifiers', rows=len(train_origins)):
+                matching = check_classifiers(classifiers)
+            if not matching:
+                raise RuntimeError('Updated classifiers do not match classifiers retrained on the whole training data')
+            print('\nUpdated classifiers match classifiers retrained on the whole training data')
+        # vectorize the testing profiles using 'profiles.py'
+        vectorizer = profiles.hashing_vectorizer()
+        test_profiles_vector = vectorizer.transform(test_profiles)
+
+    elif batch_size is None:
+
+        # vectorize the profiles using 'profiles.py'
+        train_profiles_vector, test_profiles_vector, vectorizer = profiles.vectorize(train_profiles, test_profiles)
+
+        # fit the classifiers on the training data
+        with instrument.stage('origin_profile.fit', rows=len(train_origins)):
+            multinomial_classifier.fit(train_profiles_vector, train_origins.to_numpy())
+            complement_classifier.fit(train_profiles_vector, train_origins.to_numpy())
+
+    else:
+
+        # vectorize the profiles batch by batch using 'profiles.py'
+        # fit the classifiers incrementally on the training data
+        # (all possible origins have to be known from the first batch)
+        classes = sorted(origins.printable_origins_map.values())
+        with instrument.stage('origin_profile.partial_fit', rows=len(train_origins)):
+            for batch_number, train_profiles_vector \
+                    in enumerate(profiles.vectorize_batches(train_profiles, batch_size)):
+                batch_origins = train_origins.iloc[batch_number * batch_size:(batch_number + 1) * batch_size]
+                multinomial_classifier.partial_fit(train_profiles_vector, batch_origins.to_numpy(), classes=classes)
+                complement_classifier.partial_fit(train_profiles_vector, batch_origins.to_numpy(), classes=classes)
+        vectorizer = profiles.hashing_vectorizer()
+        test_profiles_vector = vectorizer.transform(test_profiles)
+
+    # make predictions on the testing data
+    multinomial_predicted_origins = multinomial_classifier.predict(test_profiles_vector)
+    multinomial_accuracy = multinomial_classifier.score(test_profiles_vector, test_origins.to_numpy())
+    complement_predicted_origins = complement_classifier.predict(test_profiles_vector)
+    complement_accuracy = complement_classifier.score(test_profiles_vector, test_origins.to_numpy())
+
+    # the results
+    print(f'\nTrue origins: {test_origins.to_numpy()}')
+    print(f'Origins predicted with Multinomial Naive Bayes: {multinomial_predicted_origins}')
+    print(f'Accuracy (mean accuracy): {multinomial_accuracy:.2f}')
+    print(f'\nTrue origins: {test_origins.to_numpy()}')
+    print(f'Origins predicted with Complement Naive Bayes: {complement_predicted_origins}')
+    print(f'Accuracy (mean accuracy): {complement_accuracy:.2f}')
+
+    # save the models to the registry using 'models.py'
+    if register:
+        preprocessing = {'features': 'Profile', 'vectorizer': vectorizer, 'origins_map': origins.printable_origins_map}
+        models.save_model('origin_profile_multinomial_nb', multinomial_classifier, preprocessing)
+        models.save_model('origin_profile_complement_nb', complement_classifier, preprocessing)
+
+    return {'Multinomial Naive Bayes': {'model': multinomial_classifier, 'accuracy': multinomial_accuracy},
+            'Complement Naive Bayes': {'model': complement_classifier, 'accuracy': complement_accuracy}}
+
+
+def update_classifiers(state_file_name: str = 'origin_profile_state.pkl', batch_size: int = 10000,
+                       file_name: str = 'adjusted_data.csv') -> dict[str, MultinomialNB | ComplementNB]:
+    """
+    Fits the persisted classifiers on the rows appended to the training data since the last update
+
+    Parameters
+    ----------
+    state_file_name: str, default 'origin_profile_state.pkl'
+        Name of the pickle file with the classifiers, the number of training rows already seen and where they end
+    batch_size: int, default 10000
+        Number of profiles in a training batch
+    file_name: str, default 'adjusted_data.csv'
+        Name of the adjusted csv file with the training data
+
+    Returns
+    -------
+    dict[str, MultinomialNB | ComplementNB]
+        {model name: classifier} dictionary with the updated classifiers
+
+    Notes
+    -----
+    The classifiers keep their class and feature counts, so updating them with partial_fit is equivalent to retraining
+    them on the whole training data
+    Only the rows after the byte offset where the rows already seen end are read, so an update takes time proportional
+    to the new rows only
+    The classifiers are retrained from scratch if the header or the end of the rows already seen have changed (e.g. the
+    file was rewritten), see hash_boundary, rows changed in place before are not detected (see check_classifiers)
+    Raises RuntimeError if no row seen so far has both a profile and a known origin, as the classifiers are not fitted
+    """
+
+    # load the persisted state, unless the rows already seen have changed since
+    state = None
+    if os.path.exists(state_file_name):
+        with open(state_file_name, 'rb') as state_file:
+            state = pickle.load(state_file)
+        # (states saved before the offset was recorded are discarded too)
+        if 'offset' not in state or hash_boundary(file_name, state['offset']) != state['hash']:
+            state = None
+    if state is None:
+        state = {'rows': 0, 'offset': 0, 'hash': None,
+                 'classifiers': {'Multinomial Naive Bayes': MultinomialNB(), 'Complement Naive Bayes': ComplementNB()}}
+
+    # read the rows appended since the last update only
+    # (up to the current end of the file, in case rows are being appended meanwhile)
+    size = os.path.getsize(file_name)
+    with open(file_name, 'rb') as data_file:
+        data_file.seek(state['offset'])
+        new_bytes = data_file.read(size - state['offset'])
+    if not new_bytes.strip():
+        new_data = pandas.DataFrame(columns=['Profile', 'Coffee'])
+    elif state['offset']:
+        header = pandas.read_csv(file_name, nrows=0).columns
+        new_data = pandas.read_csv(io.BytesIO(new_bytes), header=None, names=header, usecols=['Profile', 'Coffee'])
+    else:
+        new_data = pandas.read_csv(io.BytesIO(new_bytes), usecols=['Profile', 'Coffee'])
+    new_data = data.apply_schema(new_data)
+
+    # transform the new training data using 'data.py' and 'origins.py'
+    if len(new_data):
+        new_profiles, new_origins = data.drop_missing(new_data['Profile'], new_data['Coffee'])
+        new_profiles, new_origins = origins.simplify_origins(new_profiles, new_origins)
+
+        # vectorize the new profiles batch by batch using 'profiles.py'
+        # fit the classifiers incrementally on the new training data
+        classes = sorted(origins.printable_origins_map.values())
+        with instrument.stage('origin_profile.update_classifiers', rows=len(new_origins)):
+            for batch_number, profiles_vector in enumerate(profiles.vectorize_batches(new_profiles, batch_size)):
+                batch_origins = new_origins.iloc[batch_number * batch_size:(batch_number + 1) * batch_size].to_numpy()
+                for classifier in state['classifiers'].values():
+                    classifier.partial_fit(profiles_vector, batch_origins, classes=classes)
+
+    # persist the updated state
+    state['rows'] += len(new_data)
+    state['offset'] = size
+    state['hash'] = hash_boundary(file_name, size)
+    with open(state_file_name, 'wb') as state_file:
+        pickle.dump(state, state_file)
+
+    # (partial_fit has not been called yet if no row has resolved to an origin)
+    if any(not hasattr(classifier, 'classes_') for classifier in state['classifiers'].values()):
+        raise RuntimeError(f'No training row of {file_name!r} has both a profile and a known origin yet, the '
+                           f'classifiers cannot be fitted')
+
+    return state['classifiers']
+
+
+def hash_boundary(file_name: str, offset: int, n_bytes: int = 2 ** 12) -> str | None:
+    """
+    Computes a hash of the header of a csv file and of the end of its rows before an offset
+
+    Parameters
+    ----------
+    file_name: str
+        Name of the csv file
+    offset: int
+        Byte offset where the rows end
+    n_bytes: int, default 2 ** 12
+        Number of bytes before the offset to hash
+
+    Returns
+    -------
+    str | None
+        Hexadecimal SHA-256 digest of the first line of the file and of the n_bytes bytes before the offset, None if
+        the file is shorter than the offset
+    """
+
+    if os.path.getsize(file_name) < offset:
+        return None
+
+    boundary_hash = hashlib.sha256()
+    with open(file_name, 'rb') as data_file:
+        boundary_hash.update(data_file.readline())
+        data_file.seek(max(offset - n_bytes, 0))
+        boundary_hash.update(data_file.read(offset - max(offset - n_bytes, 0)))
+
+    return boundary_hash.hexdigest()
+
+
+def check_classifiers(classifiers: dict[str, MultinomialNB | ComplementNB], tolerance: float = 1e-9) -> bool:
+    """
+    Checks that the classifiers match classifiers retrained on the whole training data
+
+    Parameters
+    ----------
+    classifiers: dict[str, MultinomialNB | ComplementNB]
+        {model name: classifier} dictionary returned by update_classifiers
+    tolerance: float, default 1e-9
+        Relative tolerance of the class and feature counts, and of the feature log probabilities
+
+    Returns
+    -------
+    bool
+        Whether all the classifiers match their retrained counterparts
+    """
+
+    # get and transform the whole training data using 'data.py' and 'origins.py'
+    train_profiles, train_origins = data.get_data('Profile', 'Coffee', test=False)
+    train_profiles, train_origins = origins.simplify_origins(train_profiles, train_origins)
+    train_profiles_vector = profiles.hashing_vectorizer().transform(train_profiles)
+
+    # retrain the classifiers from scratch and compare the fitted attributes
+    for classifier in classifiers.values():
+        retrained_classifier = type(classifier)(**classifier.get_params())
+        retrained_classifier.partial_fit(train_profiles_vector, train_origins.to_numpy(), classes=classifier.classes_)
+        for attribute in ['class_count_', 'feature_count_', 'feature_log_prob_']:
+            if not numpy.allclose(getattr(classifier, attribute), getattr(retrained_classifier, attribute),
+                                  rtol=tolerance, atol=0):
+                return False
+
+    return True
+
+
+if __name__ == '__main__':
+    run(incremental='--incremental' in sys.argv[1:], check='--check' in sys.argv[1:])
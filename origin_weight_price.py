@@ -2,58 +2,125 @@
 Script for classifying green coffee origin based on its price and weight
 
 Transforms the data using 'origins.py', visualizes the data, creates a Decision Tree Classifier and fits it on the
-training set, visualizes the tree, tests the model on the testing set
+training set, visualizes the tree, tests the model on the testing set, optionally exports the tree for inference
+without scikit-learn
 
 Requires installation of 'pandas', 'matplotlib', 'scikit-learn'
+
+Functions
+---------
+run
+    Classifies green coffee origin based on its price and weight
 """
 
 import data
+import instrument
+import models
 import origins
+import plots
+import tree_export
+import tuning
 from matplotlib import pyplot
 from sklearn.tree import DecisionTreeClassifier, plot_tree
 
-print('\nClassifying green coffee origin based on its price and weight...')
-
-# get relevant training and testing data using 'data.py'
-train_features, train_origins, test_features, test_origins = data.get_data(['Weight', 'Price'], 'Coffee')
-
-# transform training and testing data using 'origins.py'
-# (simplify possible origins, take into account continents rather than countries, change alphabetical data into
-#  numerical data)
-train_features, train_origins = origins.simplify_origins(train_features, train_origins)
-test_features, test_origins = origins.simplify_origins(test_features, test_origins)
-# print the mapping for reference
-print(f'\n{origins.printable_origins_map}')
-
-# plot the data
-pyplot.scatter('Weight', 'Price', data=train_features, c=train_origins, cmap='gist_rainbow')
-pyplot.colorbar(ticks=train_origins)
-pyplot.xlabel('Weight kg')
-pyplot.ylabel('Price PLN/kg')
-pyplot.title('Green coffee origin classification')
-pyplot.scatter('Weight', 'Price', data=test_features, c='black')
-pyplot.show()
-
-# convert the data to numpy arrays
-train_features = train_features.to_numpy()
-train_origins = train_origins.to_numpy()
-test_features = test_features.to_numpy()
-test_origins = test_origins.to_numpy()
-
-# create a Decision Tree Classifier for the training data
-classifier = DecisionTreeClassifier()
-classifier.fit(train_features, train_origins)
-
-# plot the decision tree
-plot_tree(classifier, max_depth=2, feature_names=['Weight', 'Price'], class_names = ['0', '1', '2', '3'])
-pyplot.title('Green coffee origin classification - decision tree')
-pyplot.show()
-
-# make predictions on the testing data
-predicted_origins = classifier.predict(test_features)
-accuracy = classifier.score(test_features, test_origins)
-
-# the results
-print(f'\nTrue origins: {test_origins}')
-print(f'Origins predicted with Decision Trees: {predicted_origins}')
-print(f'Accuracy (mean accuracy): {accuracy:.2f}')
+
+def run(show: bool = True, figures_dir: str = '.', register: bool = False, density: bool | None = None,
+        export_file_name: str | None = None) -> dict[str, dict]:
+    """
+    Classifies green coffee origin based on its price and weight
+
+    Parameters
+    ----------
+    show: bool, default True
+        Whether to show the plots, otherwise they are saved to figures_dir
+    figures_dir: str, default '.'
+        Directory for the saved plots
+    register: bool, default False
+        Whether to save the fitted model and its preprocessing to the registry using 'models.py'
+    density: bool | None, default None
+        Whether to plot the densities of the classes instead of the points using 'plots.py', if there are many points
+        if None
+    export_file_name: str | None, default None
+        Name of the npz file (or the py file, for generated code) to export the fitted tree to using 'tree_export.py',
+        not exported if None
+
+    Returns
+    -------
+    dict[str, dict]
+        {model name: {result name: result}} dictionary with the fitted model and its accuracy
+    """
+
+    print('\nClassifying green coffee origin based on its price and weight...')
+
+    # get relevant training and testing data using 'data.py'
+    train_features, train_origins, test_features, test_origins = data.get_data(['Weight', 'Price'], 'Coffee')
+
+    # transform training and testing data using 'origins.py'
+    # (simplify possible origins, take into account continents rather than countries, change alphabetical data into
+    #  numerical data)
+    train_features, train_origins = origins.simplify_origins(train_features, train_origins)
+    test_features, test_origins = origins.simplify_origins(test_features, test_origins)
+    # print the mapping for reference
+    print(f'\n{origins.printable_origins_map}')
+
+    # plot the data
+    # (or the densities of the classes, and the contours of the density of the testing data, using 'plots.py')
+    if plots.use_density(density, len(train_features)):
+        plots.plot_class_densities(train_features['Weight'], train_features['Price'], train_origins)
+    else:
+        pyplot.scatter('Weight', 'Price', data=train_features, c=train_origins, cmap='gist_rainbow')
+        pyplot.colorbar(ticks=train_origins)
+    pyplot.xlabel('Weight kg')
+    pyplot.ylabel('Price PLN/kg')
+    pyplot.title('Green coffee origin classification')
+    plots.plot_points(test_features['Weight'], test_features['Price'])
+    plots.finish('origin_weight_price.png', show, figures_dir)
+
+    # convert the data to numpy arrays
+    train_features = train_features.to_numpy()
+    train_origins = train_origins.to_numpy()
+    test_features = test_features.to_numpy()
+    test_origins = test_origins.to_numpy()
+
+    # create a Decision Tree Classifier for the training data
+    # (with the best hyperparameters found by 'tuning.py', if any)
+    classifier = DecisionTreeClassifier(**tuning.best_params('origin_weight_price', 'Decision Trees'))
+    with instrument.stage('origin_weight_price.fit', rows=len(train_features)):
+        classifier.fit(train_features, train_origins)
+
+    # plot the decision tree
+    plot_tree(classifier, max_depth=2, feature_names=['Weight', 'Price'], class_names = ['0', '1', '2', '3'])
+    pyplot.title('Green coffee origin classification - decision tree')
+    plots.finish('origin_weight_price_tree.png', show, figures_dir)
+
+    # make predictions on the testing data
+    predicted_origins = classifier.predict(test_features)
+    accuracy = classifier.score(test_features, test_origins)
+
+    # the results
+    print(f'\nTrue origins: {test_origins}')
+    print(f'Origins predicted with Decision Trees: {predicted_origins}')
+    print(f'Accuracy (mean accuracy): {accuracy:.2f}')
+
+    # export the tree for inference without scikit-learn using 'tree_export.py'
+    # (checking that the exported tree predicts the same origins)
+    if export_file_name is not None:
+        exported_tree = tree_export.export_tree(classifier)
+        if not tree_export.verify_tree(classifier, exported_tree, test_features):
+            raise RuntimeError('Exported tree does not predict the same origins as the fitted one')
+        if export_file_name.endswith('.py'):
+            with open(export_file_name, 'w') as code_file:
+                code_file.write(tree_export.generate_code(exported_tree, 'predict_origin', ['weight', 'price']))
+        else:
+            tree_export.save_tree(exported_tree, export_file_name)
+
+    # save the model to the registry using 'models.py'
+    if register:
+        models.save_model('origin_weight_price_decision_tree', classifier,
+                          {'features': ['Weight', 'Price'], 'origins_map': origins.printable_origins_map})
+
+    return {'Decision Trees': {'model': classifier, 'accuracy': accuracy}}
+
+
+if __name__ == '__main__':
+    run()
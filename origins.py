@@ -5,16 +5,26 @@ Requires installation of 'pandas'
 
 Functions
 ---------
+build_trie
+    Compiles country names and aliases into a prefix trie
+resolve_origin
+    Finds the country at the beginning of a coffee name
+resolve_origins
+    Finds the countries at the beginning of coffee names
 simplify_origins
     Simplifies coffee names to countries, then to continents, then to continent ids
 
 Notes
 -----
-For reference, print printable_origins_map (continent: continent_id dictionary)
+For reference, print printable_origins_map (continent: continent_id dictionary, the 'origins' encoder of
+'encoders.py')
 """
 
+import functools
 import pandas
 import data
+import encoders
+import instrument
 
 # possible continents
 africa = ['Burundi', 'Cameroon', "Côte d'Ivoire", 'Democratic Republic of Congo', 'Ethiopia', 'Guinea', 'Kenya',
@@ -25,21 +35,110 @@ c_america = ['Costa Rica', 'Cuba', 'Dominican Republic', 'El Salvador', 'Guatema
              'Nicaragua', 'Panama']
 s_america = ['Bolivia', 'Brazil', 'Colombia', 'Ecuador', 'Peru', 'Venezuela']
 
-# assign an integer id to each continent, and then to each country on that continent
-origins_map = {country: continent_id
-               for continent_id, continent in enumerate([africa, asia, c_america, s_america])
-               for country in continent}
-# create a printable version of the mapping for later reference
-printable_origins_map = {continent: continent_id
-                         for continent_id, continent
-                         in enumerate(['Africa', 'Asia & Oceania', 'Mexico & Central America', 'South America'])}
+# get the fixed integer id of each continent using 'encoders.py', then assign it to each country on that continent
+printable_origins_map = encoders.get_map('origins')
 # {'Africa': 0, 'Asia & Oceania': 1, 'Mexico & Central America': 2, 'South America': 3}
+origins_map = {country: printable_origins_map[continent_name]
+               for continent_name, continent in zip(['Africa', 'Asia & Oceania', 'Mexico & Central America',
+                                                     'South America'],
+                                                    [africa, asia, c_america, s_america])
+               for country in continent}
+
+# abbreviations and other names of the countries used in coffee names
+aliases = {'Costa': 'Costa Rica', 'Dom.': 'Dominican Republic', 'PNG': 'Papua New Guinea',
+           'DR Congo': 'Democratic Republic of Congo', 'DRC': 'Democratic Republic of Congo',
+           'Ivory Coast': "Côte d'Ivoire", "Cote d'Ivoire": "Côte d'Ivoire",
+           'Laos': "Lao People's Democratic Republic", 'Papua': 'Papua New Guinea'}
+
+
+def build_trie(names: dict[str, str]) -> dict:
+    """
+    Compiles country names and aliases into a prefix trie
+
+    Parameters
+    ----------
+    names: dict[str, str]
+        {name: country} dictionary
+
+    Returns
+    -------
+    dict
+        Nested {character: subtrie} dictionaries over lowercase names, with countries stored under the '' key of the
+        subtries where names end
+    """
+
+    trie = {}
+    for name, country in names.items():
+        node = trie
+        for character in name.lower():
+            node = node.setdefault(character, {})
+        node[''] = country
+
+    return trie
+
+
+# compile all the countries and their aliases once
+origins_trie = build_trie({**{country: country for country in origins_map}, **aliases})
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_origin(name: str) -> str | None:
+    """
+    Finds the country at the beginning of a coffee name
+
+    Parameters
+    ----------
+    name: str
+        Coffee name
+
+    Returns
+    -------
+    str | None
+        The longest country name or alias the coffee name starts with (ignoring case), resolved to the country,
+        None if there is none
+
+    Notes
+    -----
+    Names are not required to end with a space, so e.g. 'NicaraguaSHB' resolves to 'Nicaragua'
+    """
+
+    country = None
+    node = origins_trie
+    for character in name.lower():
+        node = node.get(character)
+        if node is None:
+            break
+        country = node.get('', country)
+
+    return country
+
+
+def resolve_origins(names: pandas.Series) -> pandas.Series:
+    """
+    Finds the countries at the beginning of coffee names
+
+    Parameters
+    ----------
+    names: pandas.Series
+        Coffee names
+
+    Returns
+    -------
+    pandas.Series
+        Countries resolved with resolve_origin, NaNs for unresolved names
+    """
+
+    # resolve each unique name only once, then map all the names in one pass
+    unique_names = names.dropna().unique()
+    return names.map({name: resolve_origin(name) for name in unique_names})
 
 
 # use the above to transform given data
 def simplify_origins(features: pandas.Series | pandas.DataFrame,
-                     origins: pandas.Series) \
-        -> tuple[pandas.Series | pandas.DataFrame, pandas.Series]:
+                     origins: pandas.Series,
+                     report: bool = False) \
+        -> tuple[pandas.Series | pandas.DataFrame, pandas.Series] \
+        | tuple[pandas.Series | pandas.DataFrame, pandas.Series, list[str]]:
     """
     Simplifies coffee names to countries, then to continents, then to continent ids
 
@@ -49,24 +148,29 @@ def simplify_origins(features: pandas.Series | pandas.DataFrame,
         Chosen coffee characteristics
     origins: pandas.Series
         Coffee names, including the countries of origin
+    report: bool, default False
+        Whether to also return the coffee names that could not be resolved to countries
 
     Returns
     -------
-    tuple[pandas.Series | pandas.DataFrame, pandas.Series]
-        Input characteristics and origins simplified with origins_map
+    tuple[pandas.Series | pandas.DataFrame, pandas.Series] \
+    | tuple[pandas.Series | pandas.DataFrame, pandas.Series, list[str]]
+        Input characteristics and origins simplified with origins_map, optionally followed by the unresolved names
     """
 
-    # extract countries from coffee names
-    origins = origins.str.partition()[0]
-    # ['Brazil' 'Colombia' 'Costa' 'Dom.' 'Ethiopia' 'Honduras' 'Indonesia' 'Kenya' 'Malawi' 'Mexico' 'Nicaragua'
-    #  'NicaraguaSHB' 'Panama' 'Peru' 'PNG' 'Rwanda' 'Tanzania' 'Uganda' 'Yemen' 'Vietnam']
-    # change Costa to Costa Rica, Dom. to Dominican Republic, PNG to Papua New Guinea
-    origins = origins.replace({'Costa': 'Costa Rica', 'Dom.': 'Dominican Republic', 'PNG': 'Papua New Guinea'})
-    # there are some mistakes (e.g. NicaraguaSHB) but they are inevitable
+    # extract countries from coffee names using resolve_origins
+    # (match the beginning of each name against all countries and aliases, e.g. 'Costa' -> 'Costa Rica',
+    #  'Dom.' -> 'Dominican Republic', 'El Salvador', 'NicaraguaSHB' -> 'Nicaragua')
+    with instrument.stage('origins.resolve_origins', rows=len(origins)):
+        countries = resolve_origins(origins)
+    unresolved_names = sorted(origins[countries.isna()].dropna().unique())
 
     # map countries to appropriate ids
-    origins = origins.map(origins_map)
-    # drop any mistakes using 'data.py'
+    origins = countries.map(origins_map)
+    # drop any unresolved names using 'data.py'
     origins, features = data.drop_missing(origins, features)
 
+    if report:
+        return features, origins, unresolved_names
+
     return features, origins
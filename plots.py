@@ -0,0 +1,207 @@
+"""
+Module for plotting large data as densities
+
+Bins the points with NumPy before rendering, so that the time of plotting and the size of the figure do not depend on
+the number of points, saves figures for headless runs
+
+Requires installation of 'numpy', 'matplotlib'
+
+Functions
+---------
+use_density
+    Decides whether to plot densities instead of points
+bin_points
+    Counts the points in each bin of a 2D histogram
+plot_density
+    Plots the density of points
+plot_class_densities
+    Plots the densities of points of each class, colored by their most frequent class
+plot_points
+    Plots a few points as markers, or many points as density contours
+finish
+    Shows the current figure or saves it to a file
+
+Notes
+-----
+Densities are plotted on a logarithmic scale, so that sparse regions remain visible next to dense ones
+"""
+
+import os
+import numpy
+from matplotlib import colors, pyplot
+from matplotlib.cm import ScalarMappable
+
+# largest number of points plotted as markers when the plotting mode is not chosen
+max_points = 10000
+
+
+def use_density(density: bool | None, n_points: int) -> bool:
+    """
+    Decides whether to plot densities instead of points
+
+    Parameters
+    ----------
+    density: bool | None
+        Plotting mode chosen by the user, chosen based on n_points if None
+    n_points: int
+        Number of points to plot
+
+    Returns
+    -------
+    bool
+        Whether to plot densities
+    """
+
+    return n_points > max_points if density is None else density
+
+
+def bin_points(x: numpy.ndarray, y: numpy.ndarray, bins: int = 100) \
+        -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """
+    Counts the points in each bin of a 2D histogram
+
+    Parameters
+    ----------
+    x: numpy.ndarray
+        Horizontal coordinates of the points
+    y: numpy.ndarray
+        Vertical coordinates of the points
+    bins: int, default 100
+        Number of bins along each axis
+
+    Returns
+    -------
+    tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        Counts (indexed by horizontal, then vertical bin), horizontal and vertical bin edges
+    """
+
+    return numpy.histogram2d(numpy.asarray(x, dtype=float), numpy.asarray(y, dtype=float), bins=bins)
+
+
+def plot_density(x: numpy.ndarray, y: numpy.ndarray, bins: int = 100, cmap: str = 'viridis') -> None:
+    """
+    Plots the density of points
+
+    Parameters
+    ----------
+    x: numpy.ndarray
+        Horizontal coordinates of the points
+    y: numpy.ndarray
+        Vertical coordinates of the points
+    bins: int, default 100
+        Number of bins along each axis
+    cmap: str, default 'viridis'
+        Name of the colormap of the counts
+
+    Returns
+    -------
+    None
+    """
+
+    counts, x_edges, y_edges = bin_points(x, y, bins)
+
+    # leave empty bins blank
+    mesh = pyplot.pcolormesh(x_edges, y_edges, numpy.ma.masked_equal(counts, 0).T, cmap=cmap, norm=colors.LogNorm())
+    pyplot.colorbar(mesh, label='Number of coffees')
+
+
+def plot_class_densities(x: numpy.ndarray, y: numpy.ndarray, classes: numpy.ndarray, bins: int = 100,
+                         cmap: str = 'gist_rainbow') -> None:
+    """
+    Plots the densities of points of each class, colored by their most frequent class
+
+    Parameters
+    ----------
+    x: numpy.ndarray
+        Horizontal coordinates of the points
+    y: numpy.ndarray
+        Vertical coordinates of the points
+    classes: numpy.ndarray
+        Numeric classes of the points (e.g. origin or process ids)
+    bins: int, default 100
+        Number of bins along each axis
+    cmap: str, default 'gist_rainbow'
+        Name of the colormap of the classes
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    The color of a bin is the color of its most frequent class, its opacity grows with its number of points
+    """
+
+    x = numpy.asarray(x, dtype=float)
+    y = numpy.asarray(y, dtype=float)
+    class_values, class_codes = numpy.unique(numpy.asarray(classes), return_inverse=True)
+
+    # count the points of each class in each bin in a single pass
+    # (a layer of the histogram for each class)
+    counts, (x_edges, y_edges, _) = numpy.histogramdd((x, y, class_codes),
+                                                      bins=(bins, bins, numpy.arange(len(class_values) + 1) - 0.5))
+    totals = counts.sum(axis=2)
+
+    # color each bin by its most frequent class, with the opacity of its (logarithmic) number of points
+    norm = colors.Normalize(class_values.min(), class_values.max())
+    image = pyplot.get_cmap(cmap)(norm(class_values[counts.argmax(axis=2)]))
+    image[..., 3] = numpy.log1p(totals) / numpy.log1p(totals.max(initial=1))
+
+    pyplot.imshow(image.transpose(1, 0, 2), origin='lower', aspect='auto', interpolation='nearest',
+                  extent=(x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]))
+    pyplot.colorbar(ScalarMappable(norm, cmap), ax=pyplot.gca(), ticks=class_values)
+
+
+def plot_points(x: numpy.ndarray, y: numpy.ndarray, color: str = 'black', bins: int = 50) -> None:
+    """
+    Plots a few points as markers, or many points as density contours
+
+    Parameters
+    ----------
+    x: numpy.ndarray
+        Horizontal coordinates of the points
+    y: numpy.ndarray
+        Vertical coordinates of the points
+    color: str, default 'black'
+        Color of the markers or contours
+    bins: int, default 50
+        Number of bins along each axis, for contours
+
+    Returns
+    -------
+    None
+    """
+
+    if len(x) <= max_points:
+        pyplot.scatter(x, y, c=color)
+        return
+
+    counts, x_edges, y_edges = bin_points(x, y, bins)
+    pyplot.contour((x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2, numpy.log1p(counts.T),
+                   colors=color, linewidths=0.8)
+
+
+def finish(file_name: str, show: bool = True, figures_dir: str = '.') -> None:
+    """
+    Shows the current figure or saves it to a file
+
+    Parameters
+    ----------
+    file_name: str
+        Name of the image file, e.g. 'price_score.png'
+    show: bool, default True
+        Whether to show the figure, otherwise it is saved to figures_dir (without a display, e.g. with the 'Agg'
+        backend of 'runner.py')
+    figures_dir: str, default '.'
+        Directory for the saved figure
+
+    Returns
+    -------
+    None
+    """
+
+    if show:
+        pyplot.show()
+    else:
+        pyplot.savefig(os.path.join(figures_dir, file_name))
+        pyplot.close()
@@ -0,0 +1,343 @@
+"""
+Module for modelling green coffee price based on its score online
+
+Keeps the sufficient statistics of the linear regression of price on score, updates them with each new offer, merges
+the statistics of chunks of data computed in parallel, persists them to a json file
+
+Requires installation of 'numpy', 'pandas'
+
+Functions
+---------
+new_statistics
+    Creates the statistics of no data
+statistics_of
+    Computes the statistics of a batch of data
+update
+    Adds a new offer to the statistics
+merge
+    Merges the statistics of separate data
+fit_line
+    Fits a straight line in closed form, given the means and the sums of squared deviations and products of deviations
+coefficients
+    Computes the linear regression of price on score from the statistics
+predict
+    Predicts prices from scores with the statistics
+fit_file
+    Computes the statistics of an adjusted data file, chunk by chunk in parallel
+save_statistics
+    Writes the statistics to a json file
+load_statistics
+    Reads the statistics from a json file
+
+Notes
+-----
+The statistics are the number of offers, the means of scores and prices, and the sums of squared deviations and
+products of deviations from the means (equivalent to n, Σx, Σy, Σx², Σxy, Σy², but numerically stable), so that
+the coefficients are the same as those of a full refit
+Usage: python price_model.py (fits the statistics to 'adjusted_data.csv')
+       python price_model.py score price [score price ...] (adds new offers to the saved statistics)
+"""
+
+import concurrent.futures
+import json
+import os
+import sys
+import numpy
+import pandas
+
+# default name of the json file with the statistics
+statistics_file_name = 'price_model.json'
+
+
+def new_statistics() -> dict[str, float]:
+    """
+    Creates the statistics of no data
+
+    Returns
+    -------
+    dict[str, float]
+        {'n': number of offers, 'mean_x': mean score, 'mean_y': mean price, 'm_xx': sum of squared score deviations,
+        'm_xy': sum of products of score and price deviations, 'm_yy': sum of squared price deviations} dictionary
+    """
+
+    return {'n': 0, 'mean_x': 0.0, 'mean_y': 0.0, 'm_xx': 0.0, 'm_xy': 0.0, 'm_yy': 0.0}
+
+
+def statistics_of(x: numpy.ndarray, y: numpy.ndarray) -> dict[str, float]:
+    """
+    Computes the statistics of a batch of data
+
+    Parameters
+    ----------
+    x: numpy.ndarray
+        Scores
+    y: numpy.ndarray
+        Prices
+
+    Returns
+    -------
+    dict[str, float]
+        Statistics, as in new_statistics
+    """
+
+    x = numpy.asarray(x, dtype=float)
+    y = numpy.asarray(y, dtype=float)
+    if not len(x):
+        return new_statistics()
+
+    dx = x - x.mean()
+    dy = y - y.mean()
+
+    return {'n': len(x), 'mean_x': float(x.mean()), 'mean_y': float(y.mean()), 'm_xx': float(dx @ dx),
+            'm_xy': float(dx @ dy), 'm_yy': float(dy @ dy)}
+
+
+def update(statistics: dict[str, float], x: float, y: float) -> dict[str, float]:
+    """
+    Adds a new offer to the statistics
+
+    Parameters
+    ----------
+    statistics: dict[str, float]
+        Statistics of the previous offers, updated in place
+    x: float
+        Score of the new offer
+    y: float
+        Price of the new offer
+
+    Returns
+    -------
+    dict[str, float]
+        Updated statistics
+
+    Notes
+    -----
+    Takes constant time, whatever the number of previous offers (Welford's algorithm)
+    """
+
+    statistics['n'] += 1
+    dx = x - statistics['mean_x']
+    dy = y - statistics['mean_y']
+    statistics['mean_x'] += dx / statistics['n']
+    statistics['mean_y'] += dy / statistics['n']
+    # (deviations from the old and the new means)
+    statistics['m_xx'] += dx * (x - statistics['mean_x'])
+    statistics['m_xy'] += dx * (y - statistics['mean_y'])
+    statistics['m_yy'] += dy * (y - statistics['mean_y'])
+
+    return statistics
+
+
+def merge(*statistics: dict[str, float]) -> dict[str, float]:
+    """
+    Merges the statistics of separate data
+
+    Parameters
+    ----------
+    *statistics: dict[str, float]
+        Statistics of separate data, e.g. chunks of a file
+
+    Returns
+    -------
+    dict[str, float]
+        Statistics of all the data
+
+    Notes
+    -----
+    Uses the pairwise formulas of Chan et al., so that the result does not depend on how the data was split
+    """
+
+    merged = new_statistics()
+    for part in statistics:
+        if not part['n']:
+            continue
+        n = merged['n'] + part['n']
+        dx = part['mean_x'] - merged['mean_x']
+        dy = part['mean_y'] - merged['mean_y']
+        weight = merged['n'] * part['n'] / n
+        merged = {'n': n,
+                  'mean_x': merged['mean_x'] + dx * part['n'] / n,
+                  'mean_y': merged['mean_y'] + dy * part['n'] / n,
+                  'm_xx': merged['m_xx'] + part['m_xx'] + dx * dx * weight,
+                  'm_xy': merged['m_xy'] + part['m_xy'] + dx * dy * weight,
+                  'm_yy': merged['m_yy'] + part['m_yy'] + dy * dy * weight}
+
+    return merged
+
+
+def fit_line(n: int | numpy.ndarray, mean_x, mean_y, m_xx, m_xy, m_yy) -> tuple:
+    """
+    Fits a straight line in closed form, given the means and the sums of squared deviations and products of deviations
+
+    Parameters
+    ----------
+    n: int | numpy.ndarray
+        Number of points
+    mean_x
+        Mean of x
+    mean_y
+        Mean of y
+    m_xx
+        Sum of squared deviations of x from its mean
+    m_xy
+        Sum of products of deviations of x and y from their means
+    m_yy
+        Sum of squared deviations of y from its mean
+
+    Returns
+    -------
+    tuple
+        Slope, intercept and coefficient of determination of the least squares line
+
+    Notes
+    -----
+    Works on numbers and, element by element, on numpy arrays of many samples (e.g. the bootstrap resamples of
+    'price_score.py', see price_score.fit_lines)
+    """
+
+    slope = m_xy / m_xx
+    intercept = mean_y - slope * mean_x
+    r2 = m_xy ** 2 / (m_xx * m_yy)
+
+    return slope, intercept, r2
+
+
+def coefficients(statistics: dict[str, float]) -> tuple[float, float, float]:
+    """
+    Computes the linear regression of price on score from the statistics
+
+    Parameters
+    ----------
+    statistics: dict[str, float]
+        Statistics of the offers
+
+    Returns
+    -------
+    tuple[float, float, float]
+        Slope, intercept and coefficient of determination
+    """
+
+    if statistics['n'] < 2 or not statistics['m_xx']:
+        raise ValueError('At least two offers with different scores are needed')
+
+    # (all prices equal, fitted exactly by a horizontal line)
+    if not statistics['m_yy']:
+        return 0.0, statistics['mean_y'], 1.0
+
+    # fit the line using fit_line
+    return fit_line(**statistics)
+
+
+def predict(statistics: dict[str, float], x: float | numpy.ndarray) -> float | numpy.ndarray:
+    """
+    Predicts prices from scores with the statistics
+
+    Parameters
+    ----------
+    statistics: dict[str, float]
+        Statistics of the offers
+    x: float | numpy.ndarray
+        Scores
+
+    Returns
+    -------
+    float | numpy.ndarray
+        Predicted prices
+    """
+
+    slope, intercept, _ = coefficients(statistics)
+
+    return slope * numpy.asarray(x, dtype=float) + intercept
+
+
+def fit_file(file_name: str = 'adjusted_data.csv', chunk_size: int = 100000, max_workers: int | None = None) \
+        -> dict[str, float]:
+    """
+    Computes the statistics of an adjusted data file, chunk by chunk in parallel
+
+    Parameters
+    ----------
+    file_name: str, default 'adjusted_data.csv'
+        Name of the adjusted csv file
+    chunk_size: int, default 100000
+        Number of rows of each chunk
+    max_workers: int | None, default None
+        Number of worker processes, the number of processors if None
+
+    Returns
+    -------
+    dict[str, float]
+        Statistics of the offers with both a score and a price
+    """
+
+    with pandas.read_csv(file_name, usecols=['Score', 'Price'], chunksize=chunk_size) as chunks, \
+            concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        # compute the statistics of each chunk in a worker process using statistics_of
+        futures = [executor.submit(statistics_of, chunk['Score'].to_numpy(), chunk['Price'].to_numpy())
+                   for chunk in (chunk.dropna() for chunk in chunks)]
+        return merge(*(future.result() for future in futures))
+
+
+def save_statistics(statistics: dict[str, float], file_name: str = statistics_file_name) -> None:
+    """
+    Writes the statistics to a json file
+
+    Parameters
+    ----------
+    statistics: dict[str, float]
+        Statistics of the offers
+    file_name: str, default statistics_file_name
+        Name of the json file
+
+    Returns
+    -------
+    None
+    """
+
+    with open(file_name, 'w') as statistics_file:
+        json.dump(statistics, statistics_file, indent=4)
+
+
+def load_statistics(file_name: str = statistics_file_name) -> dict[str, float]:
+    """
+    Reads the statistics from a json file
+
+    Parameters
+    ----------
+    file_name: str, default statistics_file_name
+        Name of the json file
+
+    Returns
+    -------
+    dict[str, float]
+        Saved statistics, the statistics of no data if the file does not exist
+    """
+
+    if not os.path.exists(file_name):
+        return new_statistics()
+
+    with open(file_name) as statistics_file:
+        return json.load(statistics_file)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:]:
+        # add the new offers to the saved statistics
+        saved_statistics = load_statistics()
+        offers = list(map(float, sys.argv[1:]))
+        for score, price in zip(offers[::2], offers[1::2]):
+            # check the price against the model before learning from it
+            # (once there is a model, see coefficients)
+            if saved_statistics['n'] >= 2 and saved_statistics['m_xx']:
+                print(f'Score {score:g}, price {price:g} PLN/kg, expected price '
+                      f'{predict(saved_statistics, score):.2f} PLN/kg')
+            update(saved_statistics, score, price)
+    else:
+        saved_statistics = fit_file()
+    save_statistics(saved_statistics)
+    try:
+        a, b, r2 = coefficients(saved_statistics)
+    except ValueError as error:
+        print(f'No model yet: {error} ({saved_statistics["n"]} offers)')
+    else:
+        print(f'Model: y = {a:.0f}x + {b:.0f}, R2 = {r2:.2f} ({saved_statistics["n"]} offers)')
@@ -1,43 +1,209 @@
 """
 Script for investigating the dependence of green coffee price on its score
 
-Creates a Linear Regression model for the data, visualizes the data and the results
+Creates a Linear Regression model for the data, visualizes the data and the results, optionally estimates confidence
+intervals of the results by bootstrapping
 
-Requires installation of 'pandas', 'matplotlib', 'scikit-learn'
+Requires installation of 'numpy', 'pandas', 'matplotlib', 'scikit-learn'
+
+Functions
+---------
+fit_lines
+    Fits straight lines in closed form, given the sufficient statistics of their samples
+bootstrap
+    Estimates confidence intervals of the slope, intercept and coefficient of determination by bootstrapping
+run
+    Investigates the dependence of green coffee price on its score
 """
 
+import numpy
 import data
+import instrument
+import models
+import plots
+import price_model
 from matplotlib import pyplot
 from sklearn.linear_model import LinearRegression
 
-print('\nInvestigating the dependence of green coffee price on its score...')
-
-# get relevant training and testing data using 'data.py'
-score, price = data.get_data('Score', 'Price', test=False)
-
-# plot the data
-pyplot.scatter(score, price)
-pyplot.xlabel('SCA score')
-pyplot.ylabel('Price PLN/kg')
-pyplot.title('Green coffee price against its score')
-
-# convert the data to numpy arrays
-score = score.to_numpy().reshape(-1, 1)
-price = price.to_numpy()
-
-# create a Linear Regression model for the data
-model = LinearRegression()
-model.fit(score, price)
-predicted_price = model.predict(score)
-
-# details of the fitted model
-a = model.coef_[0]
-b = model.intercept_
-r2 = model.score(score, price)
-print(f'\nModel obtained with Linear Regression: y = {a:.0f}x + {b:.0f}')
-print(f'Accuracy (coefficient of determination): R2 = {r2:.2f}')
-
-# plot the fitted model and its details
-pyplot.plot(score, predicted_price, color='black')
-pyplot.text(87.5, 90, f'y = {a:.0f}x + {b:.0f}\nR2 = {r2:.2f}')
-pyplot.show()
+
+def fit_lines(n: int, sx: numpy.ndarray, sy: numpy.ndarray, sxx: numpy.ndarray, sxy: numpy.ndarray,
+              syy: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """
+    Fits straight lines in closed form, given the sufficient statistics of their samples
+
+    Parameters
+    ----------
+    n: int
+        Number of points of each sample
+    sx: numpy.ndarray
+        Sums of x of each sample
+    sy: numpy.ndarray
+        Sums of y of each sample
+    sxx: numpy.ndarray
+        Sums of x squared of each sample
+    sxy: numpy.ndarray
+        Sums of x times y of each sample
+    syy: numpy.ndarray
+        Sums of y squared of each sample
+
+    Returns
+    -------
+    tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        Slopes, intercepts and coefficients of determination of the least squares lines of the samples
+    """
+
+    # means and sums of squared deviations and products of deviations of the samples
+    mean_x = sx / n
+    mean_y = sy / n
+
+    # fit the lines using 'price_model.py'
+    return price_model.fit_line(n, mean_x, mean_y, sxx - sx * mean_x, sxy - sx * mean_y, syy - sy * mean_y)
+
+
+def bootstrap(x: numpy.ndarray, y: numpy.ndarray, n_resamples: int = 10000, confidence: float = 0.95,
+              seed: int = 0, batch_elements: int = 2 ** 24) -> dict[str, tuple[float, float]]:
+    """
+    Estimates confidence intervals of the slope, intercept and coefficient of determination by bootstrapping
+
+    Parameters
+    ----------
+    x: numpy.ndarray
+        Independent variable (e.g. scores)
+    y: numpy.ndarray
+        Dependent variable (e.g. prices)
+    n_resamples: int, default 10000
+        Number of bootstrap resamples
+    confidence: float, default 0.95
+        Confidence level of the intervals
+    seed: int, default 0
+        Seed of the random resampling
+    batch_elements: int, default 2 ** 24
+        Largest number of drawn indices held in memory at a time (resamples are processed in batches)
+
+    Returns
+    -------
+    dict[str, tuple[float, float]]
+        {'slope': interval, 'intercept': interval, 'r2': interval} dictionary of percentile intervals
+
+    Notes
+    -----
+    Instead of fitting a model to each resample, counts how many times each point is drawn by each resample (a matrix
+    with a row for each resample), multiplies the counts by the per-point statistics, then fits all the lines at once
+    using fit_lines
+    """
+
+    x = numpy.asarray(x, dtype=float).ravel()
+    y = numpy.asarray(y, dtype=float).ravel()
+    n = len(x)
+
+    # center the data for numerical stability (the intercepts are shifted back at the end)
+    x_mean, y_mean = x.mean(), y.mean()
+    x, y = x - x_mean, y - y_mean
+    point_statistics = numpy.column_stack([x, y, x * x, x * y, y * y])
+
+    rng = numpy.random.default_rng(seed)
+    batch_size = max(1, batch_elements // max(n, 1))
+    statistics = []
+    for start in range(0, n_resamples, batch_size):
+        resamples = min(batch_size, n_resamples - start)
+        # draw the indices, then count the draws of each point in each resample
+        indices = rng.integers(0, n, size=(resamples, n)) + numpy.arange(resamples)[:, numpy.newaxis] * n
+        counts = numpy.bincount(indices.ravel(), minlength=resamples * n).reshape(resamples, n)
+        statistics.append(counts @ point_statistics)
+    sx, sy, sxx, sxy, syy = numpy.concatenate(statistics).T
+
+    slopes, intercepts, r2 = fit_lines(n, sx, sy, sxx, sxy, syy)
+    intercepts = intercepts + y_mean - slopes * x_mean
+
+    # percentile intervals
+    tail = (1 - confidence) / 2 * 100
+    return {name: tuple(float(bound) for bound in numpy.nanpercentile(values, [tail, 100 - tail]))
+            for name, values in [('slope', slopes), ('intercept', intercepts), ('r2', r2)]}
+
+
+def run(show: bool = True, figures_dir: str = '.', register: bool = False, density: bool | None = None,
+        n_resamples: int | None = None) -> dict[str, dict]:
+    """
+    Investigates the dependence of green coffee price on its score
+
+    Parameters
+    ----------
+    show: bool, default True
+        Whether to show the plot, otherwise it is saved to figures_dir
+    figures_dir: str, default '.'
+        Directory for the saved plot
+    register: bool, default False
+        Whether to save the fitted model and its preprocessing to the registry using 'models.py'
+    density: bool | None, default None
+        Whether to plot the density of the data instead of its points using 'plots.py', if there are many points
+        if None
+    n_resamples: int | None, default None
+        Number of bootstrap resamples for the 95% confidence intervals of the details (see bootstrap), none if None
+
+    Returns
+    -------
+    dict[str, dict]
+        {model name: {result name: result}} dictionary with the fitted model and its details (and the bounds of their
+        confidence intervals, e.g. 'slope_low', 'slope_high')
+    """
+
+    print('\nInvestigating the dependence of green coffee price on its score...')
+
+    # get relevant training and testing data using 'data.py'
+    score, price = data.get_data('Score', 'Price', test=False)
+
+    # plot the data (or its density, using 'plots.py')
+    if plots.use_density(density, len(score)):
+        plots.plot_density(score, price)
+    else:
+        pyplot.scatter(score, price)
+    pyplot.xlabel('SCA score')
+    pyplot.ylabel('Price PLN/kg')
+    pyplot.title('Green coffee price against its score')
+
+    # convert the data to numpy arrays
+    score = score.to_numpy().reshape(-1, 1)
+    price = price.to_numpy()
+
+    # create a Linear Regression model for the data
+    model = LinearRegression()
+    with instrument.stage('price_score.fit', rows=len(score)):
+        model.fit(score, price)
+    predicted_price = model.predict(score)
+
+    # details of the fitted model
+    a = model.coef_[0]
+    b = model.intercept_
+    r2 = model.score(score, price)
+    print(f'\nModel obtained with Linear Regression: y = {a:.0f}x + {b:.0f}')
+    print(f'Accuracy (coefficient of determination): R2 = {r2:.2f}')
+
+    # confidence intervals of the details
+    intervals = {}
+    if n_resamples:
+        with instrument.stage('price_score.bootstrap', rows=len(score)):
+            intervals = bootstrap(score, price, n_resamples)
+        print(f'95% confidence intervals ({n_resamples} bootstrap resamples): '
+              f'a = [{intervals["slope"][0]:.1f}, {intervals["slope"][1]:.1f}], '
+              f'b = [{intervals["intercept"][0]:.0f}, {intervals["intercept"][1]:.0f}], '
+              f'R2 = [{intervals["r2"][0]:.2f}, {intervals["r2"][1]:.2f}]')
+
+    # plot the fitted model (a line through its extreme points) and its details
+    # show or save the plot using 'plots.py'
+    extremes = [predicted_price.argmin(), predicted_price.argmax()]
+    pyplot.plot(score[extremes, 0], predicted_price[extremes], color='black')
+    pyplot.text(87.5, 90, f'y = {a:.0f}x + {b:.0f}\nR2 = {r2:.2f}')
+    plots.finish('price_score.png', show, figures_dir)
+
+    # save the model to the registry using 'models.py'
+    if register:
+        models.save_model('price_score_linear_regression', model, {'features': ['Score']})
+
+    return {'Linear Regression': {'model': model, 'slope': a, 'intercept': b, 'r2': r2,
+                                  **{f'{name}_{bound}': interval[index]
+                                     for name, interval in intervals.items()
+                                     for index, bound in enumerate(['low', 'high'])}}}
+
+
+if __name__ == '__main__':
+    run()
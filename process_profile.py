@@ -1,40 +1,277 @@
 """
 Script for classifying green coffee processing method based on its sensory profile
 
-Transforms the data using 'processes.py', vectorizes the sensory profiles using 'profiles.py', creates a Support Vector
-Classifier and fits it on the training set, tests the model on the testing set
+Transforms the data using 'processes.py', vectorizes the sensory profiles using 'profiles.py' (optionally weighting
+them with TF-IDF), creates a Support Vector Classifier (or a linear Support Vector Classifier, or a Stochastic Gradient
+Descent Classifier) and fits it on the training set, tests the model on the testing set
 
 Requires installation of 'pandas', 'nltk', 'scipy', 'scikit-learn'
+
+Functions
+---------
+prepare_data
+    Gets the training and testing data, simplifies the processes and vectorizes the profiles
+create_classifier
+    Creates a classifier with the given engine
+fit_classifier
+    Fits a classifier on the training data, in mini-batches if possible
+run
+    Classifies green coffee processing method based on its sensory profile
+compare_engines
+    Compares the accuracy and the throughput of the engines
+
+Notes
+-----
+The fitting time of the kernel Support Vector Classifier grows quadratically to cubically with the number of profiles,
+the linear engines ('linear', 'sgd') fit one-vs-rest binary classifiers on the sparse vectors in parallel and scale
+linearly, 'sgd' can also be fitted in mini-batches
+Usage: python process_profile.py [engine ...] (compares the given engines, runs the 'svc' engine if none)
 """
 
+import sys
+import time
+import numpy
 import data
+import instrument
+import models
 import processes
 import profiles
-from sklearn.svm import SVC
+import tuning
+from sklearn.feature_extraction.text import TfidfTransformer
+from sklearn.linear_model import SGDClassifier
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.svm import SVC, LinearSVC
+
+# {engine: (model name, name in the registry)} dictionary
+engines = {
+    'svc': ('Support Vector Machines', 'process_profile_svc'),
+    'linear': ('Linear Support Vector Machines', 'process_profile_linear_svc'),
+    'sgd': ('Stochastic Gradient Descent', 'process_profile_sgd')
+}
+
+
+def prepare_data(tfidf: bool = False, print_map: bool = True) -> tuple:
+    """
+    Gets the training and testing data, simplifies the processes and vectorizes the profiles
+
+    Parameters
+    ----------
+    tfidf: bool, default False
+        Whether to weight the counts of the words with TF-IDF
+    print_map: bool, default True
+        Whether to print the mapping of processing method names to ids
+
+    Returns
+    -------
+    tuple
+        Training and testing vectors (sparse matrices), training and testing processes (numpy arrays), vectorizer (with
+        the TF-IDF weighting, if any) and processes map
+    """
+
+    # get relevant training and testing data using 'data.py'
+    train_profiles, train_processes, test_profiles, test_processes = data.get_data('Profile', 'Process')
+
+    # transform training and testing data using 'processes.py'
+    # (simplify processing method names to integer ids, print the mapping for reference)
+    if print_map:
+        print()
+    processes_map = processes.create_processes_map(train_processes)
+    train_profiles, train_processes, test_profiles, test_processes \
+        = processes.simplify_processes(train_profiles, train_processes, test_profiles, test_processes,
+                                       print_map=print_map, processes_map=processes_map)
+
+    # vectorize the profiles using 'profiles.py'
+    train_profiles_vector, test_profiles_vector, vectorizer = profiles.vectorize(train_profiles, test_profiles)
+
+    # weight the counts of the words with TF-IDF (fitted on the training data)
+    if tfidf:
+        transformer = TfidfTransformer().fit(train_profiles_vector)
+        train_profiles_vector = transformer.transform(train_profiles_vector)
+        test_profiles_vector = transformer.transform(test_profiles_vector)
+        vectorizer = make_pipeline(vectorizer, transformer)
+
+    return (train_profiles_vector, test_profiles_vector, train_processes.to_numpy(), test_processes.to_numpy(),
+            vectorizer, processes_map)
+
+
+def create_classifier(engine: str = 'svc', n_jobs: int | None = None):
+    """
+    Creates a classifier with the given engine
+
+    Parameters
+    ----------
+    engine: str, default 'svc'
+        'svc' (kernel Support Vector Classifier, with the best hyperparameters found by 'tuning.py', if any), 'linear'
+        (linear Support Vector Classifier) or 'sgd' (linear Support Vector Classifier fitted with Stochastic Gradient
+        Descent)
+    n_jobs: int | None, default None
+        Number of parallel jobs fitting the one-vs-rest classifiers of the linear engines, all processors if -1
+
+    Returns
+    -------
+    SVC | OneVsRestClassifier
+        Unfitted classifier
+    """
+
+    if engine == 'svc':
+        return SVC(**tuning.best_params('process_profile', 'Support Vector Machines'))
+    if engine == 'linear':
+        return OneVsRestClassifier(LinearSVC(), n_jobs=n_jobs)
+    if engine == 'sgd':
+        return OneVsRestClassifier(SGDClassifier(random_state=0), n_jobs=n_jobs)
+
+    raise ValueError(f'Unknown engine {engine!r}')
+
+
+def fit_classifier(classifier, train_profiles_vector, train_processes: numpy.ndarray, batch_size: int | None = None):
+    """
+    Fits a classifier on the training data, in mini-batches if possible
+
+    Parameters
+    ----------
+    classifier
+        Classifier returned by create_classifier
+    train_profiles_vector
+        Training vectors (a sparse matrix)
+    train_processes: numpy.ndarray
+        Training processes
+    batch_size: int | None, default None
+        Number of rows of each mini-batch of classifiers supporting partial fitting ('sgd'), all rows at once if None
+
+    Returns
+    -------
+    SVC | OneVsRestClassifier
+        Fitted classifier
+    """
+
+    if batch_size is None or not hasattr(classifier, 'partial_fit'):
+        return classifier.fit(train_profiles_vector, train_processes)
+
+    # (all the classes have to be given to the first mini-batch)
+    classes = numpy.unique(train_processes)
+    for start in range(0, train_profiles_vector.shape[0], batch_size):
+        classifier.partial_fit(train_profiles_vector[start:start + batch_size],
+                               train_processes[start:start + batch_size], classes=classes)
+
+    return classifier
+
+
+def run(show: bool = True, figures_dir: str = '.', register: bool = False, engine: str = 'svc', tfidf: bool = False,
+        batch_size: int | None = None, n_jobs: int | None = None) -> dict[str, dict]:
+    """
+    Classifies green coffee processing method based on its sensory profile
+
+    Parameters
+    ----------
+    show: bool, default True
+        Unused, for compatibility with the other scripts (no plots)
+    figures_dir: str, default '.'
+        Unused, for compatibility with the other scripts (no plots)
+    register: bool, default False
+        Whether to save the fitted model and its preprocessing to the registry using 'models.py'
+    engine: str, default 'svc'
+        Engine of the classifier, a key of engines (see create_classifier)
+    tfidf: bool, default False
+        Whether to weight the counts of the words with TF-IDF
+    batch_size: int | None, default None
+        Number of rows of each mini-batch, for the 'sgd' engine (see fit_classifier)
+    n_jobs: int | None, default None
+        Number of parallel jobs, for the linear engines (see create_classifier)
+
+    Returns
+    -------
+    dict[str, dict]
+        {model name: {result name: result}} dictionary with the fitted model and its accuracy
+    """
+
+    print('\nClassifying green coffee processing method based on its sensory profile...')
+
+    model_name, registry_name = engines[engine]
+
+    # get, transform and vectorize the data
+    train_profiles_vector, test_profiles_vector, train_processes, test_processes, vectorizer, processes_map \
+        = prepare_data(tfidf)
+
+    # create a classifier for the training data
+    classifier = create_classifier(engine, n_jobs)
+    with instrument.stage('process_profile.fit', rows=len(train_processes)):
+        fit_classifier(classifier, train_profiles_vector, train_processes, batch_size)
+
+    # make predictions on the testing data
+    predicted_processes = classifier.predict(test_profiles_vector)
+    accuracy = classifier.score(test_profiles_vector, test_processes)
+
+    # the results
+    print(f'\nTrue processing methods: {test_processes}')
+    print(f'Processing methods predicted with {model_name}: {predicted_processes}')
+    print(f'Accuracy (mean accuracy): {accuracy:.2f}')
+
+    # save the model to the registry using 'models.py'
+    if register:
+        models.save_model(registry_name, classifier,
+                          {'features': 'Profile', 'vectorizer': vectorizer, 'processes_map': processes_map})
+
+    return {model_name: {'model': classifier, 'accuracy': accuracy}}
+
+
+def compare_engines(engine_names: list[str] | None = None, tfidf: bool = False, batch_size: int | None = None,
+                    n_jobs: int | None = None) -> dict[str, dict]:
+    """
+    Compares the accuracy and the throughput of the engines
+
+    Parameters
+    ----------
+    engine_names: list[str] | None, default None
+        Engines to compare, all the keys of engines if None
+    tfidf: bool, default False
+        Whether to weight the counts of the words with TF-IDF
+    batch_size: int | None, default None
+        Number of rows of each mini-batch, for the 'sgd' engine (see fit_classifier)
+    n_jobs: int | None, default None
+        Number of parallel jobs, for the linear engines (see create_classifier)
+
+    Returns
+    -------
+    dict[str, dict]
+        {model name: {'model': fitted classifier, 'accuracy': accuracy, 'fit_rows_per_second': fitting throughput,
+        'predict_rows_per_second': prediction throughput}} dictionary
+    """
+
+    if engine_names is None:
+        engine_names = list(engines)
+
+    print('\nComparing the engines classifying green coffee processing method based on its sensory profile...\n')
+
+    # prepare the data once, for all the engines
+    train_profiles_vector, test_profiles_vector, train_processes, test_processes, _, _ \
+        = prepare_data(tfidf, print_map=False)
 
-print('\nClassifying green coffee processing method based on its sensory profile...')
+    results = {}
+    for engine in engine_names:
+        model_name, _ = engines[engine]
 
-# get relevant training and testing data using 'data.py'
-train_profiles, train_processes, test_profiles, test_processes = data.get_data('Profile', 'Process')
+        classifier = create_classifier(engine, n_jobs)
+        start = time.perf_counter()
+        fit_classifier(classifier, train_profiles_vector, train_processes, batch_size)
+        fit_seconds = time.perf_counter() - start
 
-# transform training and testing data using 'processes.py'
-# (simplify processing method names to integer ids, print the mapping for reference)
-print()
-train_profiles, train_processes, test_profiles, test_processes \
-    = processes.simplify_processes(train_profiles, train_processes, test_profiles, test_processes, print_map=True)
+        start = time.perf_counter()
+        accuracy = classifier.score(test_profiles_vector, test_processes)
+        predict_seconds = time.perf_counter() - start
 
-# vectorize the profiles using 'profiles.py'
-train_profiles_vector, test_profiles_vector = profiles.vectorize(train_profiles, test_profiles)
+        results[model_name] = {'model': classifier, 'accuracy': accuracy,
+                               'fit_rows_per_second': len(train_processes) / max(fit_seconds, 1e-9),
+                               'predict_rows_per_second': len(test_processes) / max(predict_seconds, 1e-9)}
+        print(f'{model_name}: accuracy (mean accuracy): {accuracy:.2f}, '
+              f'fitting: {results[model_name]["fit_rows_per_second"]:.0f} rows/s, '
+              f'predicting: {results[model_name]["predict_rows_per_second"]:.0f} rows/s')
 
-# create a Support Vector Classifier for the training data
-classifier = SVC()
-classifier.fit(train_profiles_vector, train_processes.to_numpy())
+    return results
 
-# make predictions on the testing data
-predicted_processes = classifier.predict(test_profiles_vector)
-accuracy = classifier.score(test_profiles_vector, test_processes.to_numpy())
 
-# the results
-print(f'\nTrue processing methods: {test_processes.to_numpy()}')
-print(f'Processing methods predicted with Support Vector Machines: {predicted_processes}')
-print(f'Accuracy (mean accuracy): {accuracy:.2f}')
+if __name__ == '__main__':
+    if sys.argv[1:]:
+        compare_engines(sys.argv[1:])
+    else:
+        run()
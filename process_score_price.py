@@ -2,57 +2,150 @@
 Script for classifying green coffee processing method based on its price and score
 
 Transforms the data using 'processes.py', visualizes the data, creates k-Nearest Neighbors and Fixed-Radius Near
-Neighbors Classifiers and fits them on the training set, tests the models on the testing set
+Neighbors Classifiers and fits them on the training set (or classifies with a persisted index of the standardized
+training set using 'neighbors.py'), tests the models on the testing set
 
 Requires installation of 'pandas', 'matplotlib', 'scikit-learn'
+
+Functions
+---------
+run
+    Classifies green coffee processing method based on its price and score
+
+Notes
+-----
+Usage: python process_score_price.py [--scaled]
 """
 
+import sys
 import data
+import instrument
+import models
+import neighbors
+import plots
 import processes
+import tuning
 from matplotlib import pyplot
 from sklearn.neighbors import KNeighborsClassifier, RadiusNeighborsClassifier
 
-print('\nClassifying green coffee processing method based on its price and score...')
-
-# get relevant training and testing data using 'data.py'
-train_features, train_processes, test_features, test_processes = data.get_data(['Score', 'Price'], 'Process')
-
-# transform training and testing data using 'processes.py'
-# (simplify processing method names to integer ids, print the mapping for reference)
-train_features, train_processes, test_features, test_processes \
-    = processes.simplify_processes(train_features, train_processes, test_features, test_processes, print_map=True)
-
-# plot the data
-pyplot.scatter('Score', 'Price', data=train_features, c=train_processes, cmap='gist_rainbow')
-pyplot.colorbar(ticks=train_processes)
-pyplot.xlabel('SCA score')
-pyplot.ylabel('Price PLN/kg')
-pyplot.title('Green coffee processing method classification')
-pyplot.scatter('Score', 'Price', data=test_features, c='black')
-pyplot.show()
-
-# convert the data to numpy arrays
-train_features = train_features.to_numpy()
-train_processes = train_processes.to_numpy()
-test_features = test_features.to_numpy()
-test_processes = test_processes.to_numpy()
-
-# create k-Nearest Neighbors and Fixed-Radius Near Neighbors Classifiers for the training data
-k_classifier = KNeighborsClassifier()
-k_classifier.fit(train_features, train_processes)
-radius_classifier = RadiusNeighborsClassifier(radius=2)    # the default radius=1 causes Value Error due to outliers
-radius_classifier.fit(train_features, train_processes)
-
-# make predictions on the testing data
-k_predicted_processes = k_classifier.predict(test_features)
-k_accuracy = k_classifier.score(test_features, test_processes)
-radius_predicted_processes = radius_classifier.predict(test_features)
-radius_accuracy = radius_classifier.score(test_features, test_processes)
-
-# the results
-print(f'\nTrue processing methods: {test_processes}')
-print(f'Processing methods predicted with k-Nearest Neighbors: {k_predicted_processes}')
-print(f'Accuracy (mean accuracy): {k_accuracy:.2f}')
-print(f'\nTrue processing methods: {test_processes}')
-print(f'Processing methods predicted with Fixed-Radius Near Neighbors: {radius_predicted_processes}')
-print(f'Accuracy (mean accuracy): {radius_accuracy:.2f}')
+
+def run(show: bool = True, figures_dir: str = '.', register: bool = False, scaled: bool = False,
+        index_file_name: str = 'process_score_price_index.pkl', density: bool | None = None) -> dict[str, dict]:
+    """
+    Classifies green coffee processing method based on its price and score
+
+    Parameters
+    ----------
+    show: bool, default True
+        Whether to show the plot, otherwise it is saved to figures_dir
+    figures_dir: str, default '.'
+        Directory for the saved plot
+    register: bool, default False
+        Whether to save the fitted models and their preprocessing to the registry using 'models.py'
+    scaled: bool, default False
+        Whether to classify with the standardized features, using the index persisted by 'neighbors.py'
+        (the index itself is the saved model, so register is ignored)
+    index_file_name: str, default 'process_score_price_index.pkl'
+        Name of the file with the persisted index, used if scaled
+    density: bool | None, default None
+        Whether to plot the densities of the classes instead of the points using 'plots.py', if there are many points
+        if None
+
+    Returns
+    -------
+    dict[str, dict]
+        {model name: {result name: result}} dictionary with the fitted models (or the spatial index with the
+        hyperparameters, {**index, 'params': hyperparameters}) and their accuracies
+    """
+
+    print('\nClassifying green coffee processing method based on its price and score...')
+
+    # get relevant training and testing data using 'data.py'
+    train_features, train_processes, test_features, test_processes = data.get_data(['Score', 'Price'], 'Process')
+
+    # transform training and testing data using 'processes.py'
+    # (simplify processing method names to integer ids, print the mapping for reference)
+    processes_map = processes.create_processes_map(train_processes)
+    train_features, train_processes, test_features, test_processes \
+        = processes.simplify_processes(train_features, train_processes, test_features, test_processes, print_map=True,
+                                       processes_map=processes_map)
+
+    # plot the data
+    # (or the densities of the classes, and the contours of the density of the testing data, using 'plots.py')
+    if plots.use_density(density, len(train_features)):
+        plots.plot_class_densities(train_features['Score'], train_features['Price'], train_processes)
+    else:
+        pyplot.scatter('Score', 'Price', data=train_features, c=train_processes, cmap='gist_rainbow')
+        pyplot.colorbar(ticks=train_processes)
+    pyplot.xlabel('SCA score')
+    pyplot.ylabel('Price PLN/kg')
+    pyplot.title('Green coffee processing method classification')
+    plots.plot_points(test_features['Score'], test_features['Price'])
+    plots.finish('process_score_price.png', show, figures_dir)
+
+    # convert the data to numpy arrays
+    train_features = train_features.to_numpy()
+    train_processes = train_processes.to_numpy()
+    test_features = test_features.to_numpy()
+    test_processes = test_processes.to_numpy()
+
+    if scaled:
+        # standardize the features and build the spatial index once, or load it, using 'neighbors.py'
+        # (prices no longer dominate the distances, outliers are labelled with their nearest neighbor)
+        with instrument.stage('process_score_price.get_index', rows=len(train_features)):
+            index = neighbors.get_index(train_features, train_processes, index_file_name)
+
+        # (with the best hyperparameters found by 'tuning.py' for the standardized features, if any)
+        k_params = {'n_neighbors': 5, 'weights': 'uniform',
+                    **tuning.best_params('process_score_price', 'k-Nearest Neighbors (standardized)')}
+        radius_params = {'radius': 0.5, 'weights': 'uniform', 'outlier_label': None,
+                         **tuning.best_params('process_score_price', 'Fixed-Radius Near Neighbors (standardized)')}
+        # (the index with the hyperparameters of each classifier, described as such in the results)
+        k_classifier = {**index, 'params': k_params}
+        radius_classifier = {**index, 'params': radius_params}
+
+        # make predictions on the testing data
+        k_predicted_processes = neighbors.predict_k(index, test_features, k_params['n_neighbors'],
+                                                    k_params['weights'])
+        k_accuracy = (k_predicted_processes == test_processes).mean()
+        radius_predicted_processes = neighbors.predict_radius(index, test_features, **radius_params)
+        radius_accuracy = (radius_predicted_processes == test_processes).mean()
+        register = False
+    else:
+        # create k-Nearest Neighbors and Fixed-Radius Near Neighbors Classifiers for the training data
+        # (with the best hyperparameters found by 'tuning.py', if any)
+        k_classifier = KNeighborsClassifier(**tuning.best_params('process_score_price', 'k-Nearest Neighbors'))
+        with instrument.stage('process_score_price.fit_k_neighbors', rows=len(train_features)):
+            k_classifier.fit(train_features, train_processes)
+        # (the default radius=1 causes Value Error due to outliers, tuned classifiers label outliers instead)
+        radius_params = tuning.best_params('process_score_price', 'Fixed-Radius Near Neighbors')
+        radius_classifier = RadiusNeighborsClassifier(**{'radius': 2, **radius_params})
+        with instrument.stage('process_score_price.fit_radius_neighbors', rows=len(train_features)):
+            radius_classifier.fit(train_features, train_processes)
+
+        # make predictions on the testing data
+        k_predicted_processes = k_classifier.predict(test_features)
+        k_accuracy = k_classifier.score(test_features, test_processes)
+        radius_predicted_processes = radius_classifier.predict(test_features)
+        radius_accuracy = radius_classifier.score(test_features, test_processes)
+
+    # the results
+    print(f'\nTrue processing methods: {test_processes}')
+    print(f'Processing methods predicted with k-Nearest Neighbors: {k_predicted_processes}')
+    print(f'Accuracy (mean accuracy): {k_accuracy:.2f}')
+    print(f'\nTrue processing methods: {test_processes}')
+    print(f'Processing methods predicted with Fixed-Radius Near Neighbors: {radius_predicted_processes}')
+    print(f'Accuracy (mean accuracy): {radius_accuracy:.2f}')
+
+    # save the models to the registry using 'models.py'
+    if register:
+        preprocessing = {'features': ['Score', 'Price'], 'processes_map': processes_map}
+        models.save_model('process_score_price_k_neighbors', k_classifier, preprocessing)
+        models.save_model('process_score_price_radius_neighbors', radius_classifier, preprocessing)
+
+    return {'k-Nearest Neighbors': {'model': k_classifier, 'accuracy': k_accuracy},
+            'Fixed-Radius Near Neighbors': {'model': radius_classifier, 'accuracy': radius_accuracy}}
+
+
+if __name__ == '__main__':
+    run(scaled='--scaled' in sys.argv[1:])
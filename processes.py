@@ -5,19 +5,62 @@ Requires installation of 'pandas'
 
 Functions
 ---------
+create_processes_map
+    Assigns an integer id to each frequent processing method
 simplify_processes
     Simplifies processing method names to integer ids
+
+Notes
+-----
+Ids are kept in the 'processes' encoder of 'encoders.py', so that they do not change between runs
 """
 
 import pandas
 import data
+import encoders
+import instrument
+
+
+def create_processes_map(train_processes: pandas.Series) -> dict[str, int]:
+    """
+    Assigns an integer id to each frequent processing method
+
+    Parameters
+    ----------
+    train_processes: pandas.Series
+        Processing methods for training
+
+    Returns
+    -------
+    dict[str, int]
+        {process: process_id} map of the processing methods present more than twice, ordered by id
+
+    Notes
+    -----
+    Known processing methods have fixed ids (see encoders.default_encoders), processing methods seen for the first time
+    get the next free ids, in order of frequency
+    """
+
+    # count the processing methods, most frequent first, ties in order of appearance
+    # (whether they are stored as strings or as categories)
+    counts = train_processes.value_counts().reindex(train_processes.dropna().unique())
+    counts = counts.sort_values(ascending=False, kind='stable')
+    frequent_processes = [process for process, many in counts.gt(2).items() if many]
+
+    # register new processing methods with the next free ids using 'encoders.py'
+    # (the registry is locked only if there are any)
+    encoders.register_labels('processes', frequent_processes)
+
+    return {process: process_id for process, process_id in encoders.get_map('processes').items()
+            if process in frequent_processes}
 
 
 def simplify_processes(train_features: pandas.Series | pandas.DataFrame,
                        train_processes: pandas.Series,
                        test_features: pandas.Series | pandas.DataFrame,
                        test_processes: pandas.Series,
-                       print_map: bool = True) \
+                       print_map: bool = True,
+                       processes_map: dict[str, int] | None = None) \
         -> tuple[pandas.Series | pandas.DataFrame, pandas.Series, 
                  pandas.Series | pandas.DataFrame, pandas.Series]:
     """
@@ -35,6 +78,9 @@ def simplify_processes(train_features: pandas.Series | pandas.DataFrame,
         Processing methods for testing
     print_map: bool, default True
         Whether to print the {process: process_id} map
+    processes_map: dict[str, int] | None, default None
+        {process: process_id} map already returned by create_processes_map for the training processes, created using
+        create_processes_map if None
 
     Returns
     -------
@@ -42,16 +88,19 @@ def simplify_processes(train_features: pandas.Series | pandas.DataFrame,
         Input characteristics and processing methods simplified with the {process: process_id} map
     """
 
-    # assign an integer id to each processing method
-    processes_map = {process: process_id 
-                     for process_id, process 
-                     in enumerate([process
-                                   for process, many in train_processes.value_counts().gt(2).items() if many])}
+    # assign an integer id to each processing method using create_processes_map
+    # (unless the caller already has)
+    if processes_map is None:
+        processes_map = create_processes_map(train_processes)
     # {'washed': 0, 'natural': 1, 'pulped natural': 2, 'anaerobic': 3}
 
     # transform given data using the mapping
-    train_processes = train_processes.map(processes_map)
-    test_processes = test_processes.map(processes_map)
+    with instrument.stage('processes.simplify_processes', rows=len(train_processes) + len(test_processes)):
+        # (encode with categorical codes using 'encoders.py', mark unseen and infrequent processing methods as NaNs)
+        train_processes = encoders.encode('processes', train_processes)
+        train_processes = train_processes.where(train_processes.isin(processes_map.values()))
+        test_processes = encoders.encode('processes', test_processes)
+        test_processes = test_processes.where(test_processes.isin(processes_map.values()))
     # drop any mistakes using 'data.py'
     train_processes, train_features = data.drop_missing(train_processes, train_features)
     test_processes, test_features = data.drop_missing(test_processes, test_features)
@@ -1,27 +1,81 @@
 """
 Module for simplifying possible sensory profiles
 
-Uses Snowball Stemmer, Count Vectorizer
+Uses Snowball Stemmer, Count Vectorizer, Hashing Vectorizer
 
 Requires installation of 'nltk', 'pandas', 'scipy', 'scikit-learn'
 
 Functions
 ---------
+load_nltk
+    Loads the tokenizer, the stop words and the Snowball Stemmer of NLTK
 check
     Checks for stop words and punctuation
+stem
+    Stems the word using Snowball Stemmer
 tokenize
     Tokenizes the text, stems the words, removes stop words
+hash_profiles
+    Computes a content hash of the profiles
+create_vectorizer
+    Creates a Count Vectorizer with tokenize
+cache_key
+    Computes the key of the cached vectors of the profiles
 vectorize
     Vectorizes the training and testing profiles
+hashing_vectorizer
+    Creates a Hashing Vectorizer with tokenize
+vectorize_batches
+    Vectorizes the profiles batch by batch using hashing_vectorizer
+vectorize_parallel
+    Vectorizes the profiles in parallel using hashing_vectorizer
+
+Notes
+-----
+NLTK (with its stop words corpus) is imported and loaded once, on first use rather than on import, stems are cached
+Vectorized profiles are cached on disk, in 'profiles_cache' by default, keyed by the profiles and the vectorization
+settings (see cache_key)
 """
 
-from nltk.tokenize import wordpunct_tokenize
-from nltk.stem import SnowballStemmer
-from nltk.corpus import stopwords
+import concurrent.futures
+import functools
+import hashlib
+import json
+import os
 import string
 import pandas
 import scipy
-from sklearn.feature_extraction.text import CountVectorizer
+import instrument
+from collections.abc import Iterator
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
+
+# version of the tokenization, to be increased whenever check, stem or tokenize change
+# (so that profiles cached by earlier versions are vectorized again)
+tokenizer_version = 2
+
+
+# load NLTK lazily, so that importing this module stays cheap
+@functools.cache
+def load_nltk() -> tuple:
+    """
+    Loads the tokenizer, the stop words and the Snowball Stemmer of NLTK
+
+    Returns
+    -------
+    tuple
+        Word and punctuation tokenizer, stop words (a set, for constant-time lookups) and Snowball Stemmer (shared
+        between all the documents)
+
+    Notes
+    -----
+    Loaded once, on first call
+    """
+
+    from nltk.corpus import stopwords
+    from nltk.stem import SnowballStemmer
+    from nltk.tokenize import wordpunct_tokenize
+
+    return wordpunct_tokenize, frozenset(stopwords.words('english')), SnowballStemmer('english')
 
 
 # define a stop words checker
@@ -40,7 +94,36 @@ def check(token: str) -> bool:
         Whether the token is a stop word or a punctuation character
     """
 
-    return token not in stopwords.words('english') and token not in string.punctuation
+    _, stop_words, _ = load_nltk()
+
+    # (punctuation tokens, as in the original check, which is a substring test on the string of punctuation characters)
+    return token not in stop_words and token not in string.punctuation
+
+
+# define a memoized stemmer
+@functools.lru_cache(maxsize=2 ** 16)
+def stem(token: str) -> str:
+    """
+    Stems the word using Snowball Stemmer
+
+    Parameters
+    ----------
+    token: str
+        Word to be stemmed
+
+    Returns
+    -------
+    str
+        Stem of the input word
+
+    Notes
+    -----
+    Results are cached, for hit/miss counters call stem.cache_info()
+    """
+
+    _, _, stemmer = load_nltk()
+
+    return stemmer.stem(token)
 
 
 # define a tokenizer
@@ -60,20 +143,100 @@ def tokenize(text: str) -> list[str]:
     """
 
     # tokenize given text
+    wordpunct_tokenize, _, _ = load_nltk()
     text_tokens = wordpunct_tokenize(text)
 
-    # stem the words using Snowball Stemmer
+    # stem the words using stem
     # remove stop words and punctuation using check
-    stemmer = SnowballStemmer('english')
-    text_tokens = [stemmer.stem(token) for token in text_tokens if check(token)]
+    text_tokens = [stem(token) for token in text_tokens if check(token)]
 
     return text_tokens
 
 
+# define a content hash of the profiles
+def hash_profiles(*profiles: pandas.Series) -> str:
+    """
+    Computes a content hash of the profiles
+
+    Parameters
+    ----------
+    *profiles: pandas.Series
+        Sensory profiles
+
+    Returns
+    -------
+    str
+        Hexadecimal SHA-256 digest of the profiles, independent of their indices
+    """
+
+    profiles_hash = hashlib.sha256()
+    for profiles_series in profiles:
+        profiles_hash.update(pandas.util.hash_pandas_object(profiles_series, index=False).to_numpy().tobytes())
+        # separate the series, so that moving profiles between them changes the hash
+        profiles_hash.update(b'|')
+
+    return profiles_hash.hexdigest()
+
+
+# define a Count Vectorizer
+def create_vectorizer(vocabulary: dict[str, int] | None = None) -> CountVectorizer:
+    """
+    Creates a Count Vectorizer with tokenize
+
+    Parameters
+    ----------
+    vocabulary: dict[str, int] | None, default None
+        {feature: index} vocabulary of a fitted vectorizer, learned on fitting if None
+
+    Returns
+    -------
+    CountVectorizer
+        Vectorizer counting the occurrences of stems
+    """
+
+    return CountVectorizer(tokenizer=tokenize, token_pattern=None, vocabulary=vocabulary)
+
+
+# define a key of the cached vectors
+def cache_key(*profiles: pandas.Series) -> str:
+    """
+    Computes the key of the cached vectors of the profiles
+
+    Parameters
+    ----------
+    *profiles: pandas.Series
+        Sensory profiles
+
+    Returns
+    -------
+    str
+        Hexadecimal SHA-256 digest of hash_profiles of the profiles and of the vectorization settings
+        (tokenizer_version, the NLTK version, the stop words and the parameters of create_vectorizer)
+    """
+
+    import nltk
+
+    _, stop_words, _ = load_nltk()
+    settings = {'tokenizer_version': tokenizer_version,
+                'nltk': nltk.__version__,
+                'stop_words': sorted(stop_words),
+                # (the tokenizer itself is covered by tokenizer_version)
+                'vectorizer': {parameter: value for parameter, value in create_vectorizer().get_params().items()
+                               if parameter != 'tokenizer'}}
+
+    key = hashlib.sha256(hash_profiles(*profiles).encode())
+    key.update(json.dumps(settings, sort_keys=True, default=repr).encode())
+
+    return key.hexdigest()
+
+
 # define a vectorizer
 def vectorize(train_profiles: pandas.Series,
-              test_profiles: pandas.Series) \
-        -> tuple[scipy.sparse.csr_matrix, scipy.sparse.csr_matrix]:
+              test_profiles: pandas.Series,
+              cache_dir: str | None = 'profiles_cache',
+              hashing: bool = False,
+              n_features: int = 2 ** 12) \
+        -> tuple[scipy.sparse.csr_matrix, scipy.sparse.csr_matrix, CountVectorizer | HashingVectorizer]:
     """
     Vectorizes the training and testing profiles
 
@@ -83,20 +246,54 @@ def vectorize(train_profiles: pandas.Series,
         Sensory profiles for training
     test_profiles: pandas.Series
         Sensory profiles for testing
+    cache_dir: str | None, default 'profiles_cache'
+        Directory for the vectorized profiles and their vocabulary, not cached if None
+    hashing: bool, default False
+        Whether to use the stateless hashing_vectorizer instead of Count Vectorizer (never cached)
+    n_features: int, default 2 ** 12
+        Number of features of hashing_vectorizer
 
     Returns
     -------
-    tuple[scipy.sparse.csr_matrix, scipy.sparse.csr_matrix]
-        Profiles vectorized using Count Vectorizer with tokenize
+    tuple[scipy.sparse.csr_matrix, scipy.sparse.csr_matrix, CountVectorizer | HashingVectorizer]
+        Profiles vectorized using Count Vectorizer (or Hashing Vectorizer) with tokenize, and the vectorizer (fitted on
+        the training profiles), e.g. for vectorizing new profiles later on
+
+    Notes
+    -----
+    Cached files are named after cache_key of the training and testing profiles, so they are reused by every model
+    trained on the same profiles and invalidated whenever the profiles or the vectorization settings change
+    The profiles are those left after the filtering of each analysis (the vocabulary is fitted on them), so analyses
+    dropping different rows, e.g. 'origin_profile.py' (unknown origins) and 'process_profile.py' (unknown processing
+    methods), do not share cached files, while 'process_profile.py' and 'tuning.py' do
     """
 
-    # create a Count Vectorizer for the training data
-    # vectorize the training profiles
-    # (tokenize the text using tokenize, count the occurrences for each coffee)
-    vectorizer = CountVectorizer(tokenizer=tokenize, token_pattern=None)
-    train_profiles_vector = vectorizer.fit_transform(train_profiles)
-    # vectorize the testing profiles
-    test_profiles_vector = vectorizer.transform(test_profiles)
+    # (measure cached and computed vectorizations alike)
+    with instrument.stage('profiles.vectorize', rows=len(train_profiles) + len(test_profiles)):
+        # vectorize the profiles independently of each other using hashing_vectorizer
+        if hashing:
+            vectorizer = hashing_vectorizer(n_features)
+            return vectorizer.transform(train_profiles), vectorizer.transform(test_profiles), vectorizer
+
+        # reuse the cached vectors if the same profiles have already been vectorized with the same settings
+        if cache_dir is not None:
+            profiles_key = cache_key(train_profiles, test_profiles)
+            train_file_name = os.path.join(cache_dir, f'{profiles_key}_train.npz')
+            test_file_name = os.path.join(cache_dir, f'{profiles_key}_test.npz')
+            vocabulary_file_name = os.path.join(cache_dir, f'{profiles_key}_vocabulary.json')
+            if os.path.exists(train_file_name) and os.path.exists(test_file_name):
+                with open(vocabulary_file_name) as vocabulary_file:
+                    vectorizer = create_vectorizer(json.load(vocabulary_file))
+                return (scipy.sparse.load_npz(train_file_name).tocsr(), scipy.sparse.load_npz(test_file_name).tocsr(),
+                        vectorizer)
+
+        # create a Count Vectorizer for the training data using create_vectorizer
+        # vectorize the training profiles
+        # (tokenize the text using tokenize, count the occurrences for each coffee)
+        vectorizer = create_vectorizer()
+        train_profiles_vector = vectorizer.fit_transform(train_profiles)
+        # vectorize the testing profiles
+        test_profiles_vector = vectorizer.transform(test_profiles)
 
     # feature names corresponding to possible sensory notes
     # ['acid' 'almond' 'appl' 'apricot' 'bergamot' 'berri' 'biscuit' 'black' 'blackberri' 'blosom' 'blossom' 'blueberri'
@@ -110,4 +307,105 @@ def vectorize(train_profiles: pandas.Series,
     #  'sugar' 'sweet' 'syrup' 'tea' 'tropic' 'vanilla' 'vibrant' 'violet' 'walnut' 'white' 'wild' 'yellow']
     # there are some mistakes (blosom, current, goosberry, hazelnurt) but they are inevitable
 
-    return train_profiles_vector, test_profiles_vector
+    # cache the vectors and the vocabulary
+    # (write temporary files first, so that analyses run in parallel by 'runner.py' never read partial files)
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        temporary_suffix = f'.{os.getpid()}.tmp'
+        with open(vocabulary_file_name + temporary_suffix, 'w') as vocabulary_file:
+            json.dump({feature: int(index) for feature, index in vectorizer.vocabulary_.items()}, vocabulary_file)
+        for file_name, profiles_vector in [(test_file_name, test_profiles_vector),
+                                           (train_file_name, train_profiles_vector)]:
+            with open(file_name + temporary_suffix, 'wb') as vector_file:
+                scipy.sparse.save_npz(vector_file, profiles_vector)
+        # (the training vectors last, as their file marks a complete cache entry)
+        for file_name in [vocabulary_file_name, test_file_name, train_file_name]:
+            os.replace(file_name + temporary_suffix, file_name)
+
+    return train_profiles_vector, test_profiles_vector, vectorizer
+
+
+# define a stateless vectorizer
+def hashing_vectorizer(n_features: int = 2 ** 12) -> HashingVectorizer:
+    """
+    Creates a Hashing Vectorizer with tokenize
+
+    Parameters
+    ----------
+    n_features: int, default 2 ** 12
+        Number of features (hash buckets)
+
+    Returns
+    -------
+    HashingVectorizer
+        Vectorizer counting the occurrences of hashed stems, with non-negative values suitable for Naive Bayes
+
+    Notes
+    -----
+    The vectorizer needs no fitting, so it gives the same vectors for the same profile in any batch or process
+    """
+
+    return HashingVectorizer(tokenizer=tokenize, token_pattern=None, n_features=n_features, alternate_sign=False,
+                             norm=None)
+
+
+def vectorize_batches(profiles: pandas.Series,
+                      batch_size: int,
+                      n_features: int = 2 ** 12) \
+        -> Iterator[scipy.sparse.csr_matrix]:
+    """
+    Vectorizes the profiles batch by batch using hashing_vectorizer
+
+    Parameters
+    ----------
+    profiles: pandas.Series
+        Sensory profiles
+    batch_size: int
+        Number of profiles in a batch
+    n_features: int, default 2 ** 12
+        Number of features of hashing_vectorizer
+
+    Returns
+    -------
+    Iterator[scipy.sparse.csr_matrix]
+        Vectorized batches of profiles, in order
+    """
+
+    vectorizer = hashing_vectorizer(n_features)
+    for start in range(0, len(profiles), batch_size):
+        yield vectorizer.transform(profiles.iloc[start:start + batch_size])
+
+
+def vectorize_parallel(profiles: pandas.Series,
+                       batch_size: int = 10000,
+                       n_features: int = 2 ** 12,
+                       max_workers: int | None = None) \
+        -> scipy.sparse.csr_matrix:
+    """
+    Vectorizes the profiles in parallel using hashing_vectorizer
+
+    Parameters
+    ----------
+    profiles: pandas.Series
+        Sensory profiles
+    batch_size: int, default 10000
+        Number of profiles vectorized by a worker at a time
+    n_features: int, default 2 ** 12
+        Number of features of hashing_vectorizer
+    max_workers: int | None, default None
+        Number of worker processes, the number of processors if None
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        Vectorized profiles
+    """
+
+    # split the profiles into batches, the workers share no vocabulary
+    vectorizer = hashing_vectorizer(n_features)
+    batches = [profiles.iloc[start:start + batch_size] for start in range(0, len(profiles), batch_size)]
+    if not batches:
+        return vectorizer.transform(profiles)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        return scipy.sparse.vstack(list(executor.map(vectorizer.transform, batches)), format='csr')
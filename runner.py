@@ -0,0 +1,187 @@
+"""
+Script for running the analyses in parallel, without user interaction
+
+Runs 'price_score.py', 'origin_weight_price.py', 'origin_profile.py', 'process_score_price.py', 'process_profile.py'
+concurrently in a process pool with a non-interactive plotting backend, saves the plots to files, collects the results
+and writes them to a json file
+
+Requires installation of 'pandas', 'matplotlib', 'scikit-learn', 'nltk', 'scipy'
+
+Functions
+---------
+use_headless_backend
+    Switches plotting to the non-interactive 'Agg' backend
+run_experiment
+    Runs a single analysis without showing the plots
+run_experiments
+    Runs the analyses in parallel, then writes their results to a json file
+describe_results
+    Converts the results of the analyses to a json-serializable form
+
+Notes
+-----
+Usage: python runner.py [--scaled] [experiment ...]
+"""
+
+import concurrent.futures
+import contextlib
+import importlib
+import io
+import json
+import sys
+import instrument
+
+# names of the modules with the analyses
+experiments = ['price_score', 'origin_weight_price', 'origin_profile', 'process_score_price', 'process_profile']
+
+
+def use_headless_backend() -> None:
+    """
+    Switches plotting to the non-interactive 'Agg' backend
+
+    Returns
+    -------
+    None
+    """
+
+    # (imported only when needed, like the analyses themselves)
+    import matplotlib
+
+    matplotlib.use('Agg')
+
+
+def run_experiment(experiment: str, figures_dir: str = '.', register: bool = False, scaled: bool = False) -> dict:
+    """
+    Runs a single analysis without showing the plots
+
+    Parameters
+    ----------
+    experiment: str
+        Name of the module with the analysis
+    figures_dir: str, default '.'
+        Directory for the saved plots
+    register: bool, default False
+        Whether to save the fitted models to the registry using 'models.py'
+    scaled: bool, default False
+        Whether 'process_score_price.py' classifies with the persisted spatial index of standardized features
+
+    Returns
+    -------
+    dict
+        {'results': results of the analysis, 'output': printed output of the analysis, 'stages': stages recorded by
+        'instrument.py'} dictionary
+    """
+
+    use_headless_backend()
+
+    # capture the printed output, so that the outputs of concurrent analyses do not interleave
+    output = io.StringIO()
+    first_stage = len(instrument.records)
+    # (only 'process_score_price.py' has a scaled mode)
+    options = {'scaled': scaled} if experiment == 'process_score_price' else {}
+    with contextlib.redirect_stdout(output):
+        results = importlib.import_module(experiment).run(show=False, figures_dir=figures_dir, register=register,
+                                                          **options)
+
+    # hand over the stages of this analysis only, as worker processes run many analyses
+    stages = instrument.records[first_stage:]
+    del instrument.records[first_stage:]
+
+    return {'results': results, 'output': output.getvalue(), 'stages': stages}
+
+
+def run_experiments(names: list[str] | None = None,
+                    max_workers: int | None = None,
+                    figures_dir: str = '.',
+                    results_file_name: str | None = 'results.json',
+                    register: bool = False,
+                    scaled: bool = False) -> dict[str, dict]:
+    """
+    Runs the analyses in parallel, then writes their results to a json file
+
+    Parameters
+    ----------
+    names: list[str] | None, default None
+        Names of the analyses to run, all of them if None
+    max_workers: int | None, default None
+        Number of worker processes, the number of processors if None
+    figures_dir: str, default '.'
+        Directory for the saved plots
+    results_file_name: str | None, default 'results.json'
+        Name of the json file for the results, not written if None
+    register: bool, default False
+        Whether to save the fitted models to the registry using 'models.py'
+    scaled: bool, default False
+        Whether 'process_score_price.py' classifies with the persisted spatial index of standardized features
+
+    Returns
+    -------
+    dict[str, dict]
+        {analysis name: {model name: {result name: result}}} dictionary with the fitted models and their results
+    """
+
+    if names is None:
+        names = experiments
+
+    # run the analyses concurrently
+    with concurrent.futures.ProcessPoolExecutor(max_workers, initializer=use_headless_backend) as executor:
+        futures = {name: executor.submit(run_experiment, name, figures_dir, register, scaled) for name in names}
+
+        # print the outputs in a fixed order
+        results = {}
+        for name, future in futures.items():
+            experiment_results = future.result()
+            print(experiment_results['output'], end='')
+            results[name] = experiment_results['results']
+            # gather the stages measured in the worker processes
+            instrument.records.extend(experiment_results['stages'])
+
+    # write the results to a json file
+    if results_file_name is not None:
+        with open(results_file_name, 'w') as results_file:
+            json.dump(describe_results(results), results_file, indent=4)
+
+    return results
+
+
+def describe_results(results: dict[str, dict]) -> dict[str, dict]:
+    """
+    Converts the results of the analyses to a json-serializable form
+
+    Parameters
+    ----------
+    results: dict[str, dict]
+        {analysis name: {model name: {result name: result}}} dictionary
+
+    Returns
+    -------
+    dict[str, dict]
+        Input dictionary with models replaced by their names and parameters, and numbers converted to floats
+    """
+
+    described_results = {}
+    for name, models in results.items():
+        described_results[name] = {}
+        for model_name, model_results in models.items():
+            described_model_results = {}
+            for result_name, result in model_results.items():
+                if result_name == 'model':
+                    # (spatial indexes of 'neighbors.py' are described by their tree and hyperparameters)
+                    estimator, parameters = (result['tree'], result['params']) if isinstance(result, dict) \
+                        else (result, getattr(result, 'get_params', dict)())
+                    # keep json-compatible parameters as they are, describe the others with their repr
+                    parameters = {parameter: value if isinstance(value, (str, int, float, bool, type(None)))
+                                  else repr(value)
+                                  for parameter, value in parameters.items()}
+                    described_model_results['model'] = {'estimator': type(estimator).__name__,
+                                                        'parameters': parameters}
+                else:
+                    described_model_results[result_name] = float(result)
+            described_results[name][model_name] = described_model_results
+
+    return described_results
+
+
+if __name__ == '__main__':
+    run_experiments([argument for argument in sys.argv[1:] if argument != '--scaled'] or None,
+                    scaled='--scaled' in sys.argv[1:])
@@ -0,0 +1,182 @@
+"""
+Module for predicting with the models saved in the registry
+
+Loads each model once using 'models.py', answers batched prediction requests in-process or over a local HTTP server
+
+Requires installation of 'pandas', 'scikit-learn' (and 'nltk', 'scipy' for models based on sensory profiles)
+
+Functions
+---------
+predict
+    Predicts the targets of new coffees with a saved model
+serve
+    Serves predictions over HTTP on the local host
+
+Classes
+-------
+PredictionHandler
+    Handles HTTP prediction requests
+
+Notes
+-----
+Usage: python service.py [port]
+HTTP API: GET /models lists the saved models, POST /predict/model_name with a {"rows": [{column: value}, ...],
+"version": optional version} json body returns {"predictions": [...], "version": version}
+"""
+
+import http.server
+import json
+import sys
+import pandas
+import models
+
+
+def predict(name: str, rows: list[dict] | pandas.DataFrame, version: int | None = None) -> tuple[list, int]:
+    """
+    Predicts the targets of new coffees with a saved model
+
+    Parameters
+    ----------
+    name: str
+        Name of the model in the registry
+    rows: list[dict] | pandas.DataFrame
+        New coffees, with (at least) the columns used as features by the model
+    version: int | None, default None
+        Version of the model, the latest one if None
+
+    Returns
+    -------
+    tuple[list, int]
+        Predicted targets, with ids translated back to names if the model uses an origins or processes map, and the
+        version of the model used
+    """
+
+    # load the model (unpickled only once) using 'models.py'
+    saved_model = models.load_model(name, version)
+    model = saved_model['model']
+    preprocessing = saved_model['preprocessing']
+
+    # select the features of the whole batch
+    rows = pandas.DataFrame(rows)
+    features = rows[preprocessing['features']]
+
+    # transform the features the same way as the training data
+    if 'vectorizer' in preprocessing:
+        features = preprocessing['vectorizer'].transform(features)
+    else:
+        features = features.to_numpy()
+
+    predictions = model.predict(features).tolist()
+
+    # translate ids back to names
+    for map_name in ['origins_map', 'processes_map']:
+        if map_name in preprocessing:
+            names = {target_id: target_name for target_name, target_id in preprocessing[map_name].items()}
+            predictions = [names[int(prediction)] for prediction in predictions]
+
+    return predictions, saved_model['version']
+
+
+class PredictionHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Handles HTTP prediction requests
+
+    Methods
+    -------
+    do_GET
+        Lists the saved models
+    do_POST
+        Predicts the targets of new coffees with a saved model
+    send_json
+        Sends a json response
+    """
+
+    def do_GET(self) -> None:
+        """
+        Lists the saved models
+
+        Returns
+        -------
+        None
+        """
+
+        if self.path == '/models':
+            self.send_json(200, models.list_models())
+        else:
+            self.send_json(404, {'error': f'Unknown path {self.path!r}'})
+
+    def do_POST(self) -> None:
+        """
+        Predicts the targets of new coffees with a saved model
+
+        Returns
+        -------
+        None
+        """
+
+        if not self.path.startswith('/predict/'):
+            self.send_json(404, {'error': f'Unknown path {self.path!r}'})
+            return
+
+        name = self.path.removeprefix('/predict/')
+        if name not in models.list_models():
+            self.send_json(404, {'error': f'Unknown model {name!r}'})
+            return
+
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            # (any json value is valid, e.g. a list or a string)
+            if not isinstance(request, dict) or not isinstance(request.get('rows'), list):
+                self.send_json(400, {'error': 'The body should be a {"rows": [...]} json object'})
+                return
+            predictions, version = predict(name, request['rows'], request.get('version'))
+        except (KeyError, ValueError, TypeError) as error:
+            self.send_json(400, {'error': str(error)})
+        else:
+            self.send_json(200, {'predictions': predictions, 'version': version})
+
+    def send_json(self, status: int, content) -> None:
+        """
+        Sends a json response
+
+        Parameters
+        ----------
+        status: int
+            HTTP status code
+        content
+            Json-serializable content of the response
+
+        Returns
+        -------
+        None
+        """
+
+        body = json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(port: int = 8000) -> None:
+    """
+    Serves predictions over HTTP on the local host
+
+    Parameters
+    ----------
+    port: int, default 8000
+        Port of the server
+
+    Returns
+    -------
+    None
+    """
+
+    with http.server.ThreadingHTTPServer(('127.0.0.1', port), PredictionHandler) as server:
+        print(f'\nServing predictions on http://127.0.0.1:{port}...')
+        server.serve_forever()
+
+
+if __name__ == '__main__':
+    serve(*map(int, sys.argv[1:]))
@@ -0,0 +1,244 @@
+"""
+Module for exporting fitted decision trees for inference without scikit-learn
+
+Compiles a fitted Decision Tree Classifier into flat arrays (feature, threshold, children and class of each node),
+predicts with them in batches, saves them to a npz file, optionally generates the tree as Python code
+
+Requires installation of 'numpy'
+
+Functions
+---------
+export_tree
+    Compiles a fitted decision tree into flat arrays
+predict
+    Predicts classes with an exported tree
+save_tree
+    Writes an exported tree to a npz file
+load_tree
+    Reads an exported tree from a npz file
+generate_code
+    Generates a dependency-free Python function predicting with an exported tree
+verify_tree
+    Checks whether an exported tree predicts the same classes as the fitted one
+
+Notes
+-----
+Like scikit-learn, compares the features cast to single precision with the double precision thresholds and sends
+missing values to the child learned during fitting, so that the predictions are identical
+"""
+
+import numpy
+
+# index of the feature of leaves in scikit-learn trees
+leaf_feature = -2
+
+# largest single precision number
+float32_max = float(numpy.finfo(numpy.float32).max)
+
+# deepest tree to generate as nested conditions (Python limits the indentation depth to 100 levels)
+max_code_depth = 90
+
+
+def export_tree(classifier) -> dict[str, numpy.ndarray]:
+    """
+    Compiles a fitted decision tree into flat arrays
+
+    Parameters
+    ----------
+    classifier: sklearn.tree.DecisionTreeClassifier
+        Fitted single-output decision tree
+
+    Returns
+    -------
+    dict[str, numpy.ndarray]
+        {'feature': feature of each node, 'threshold': threshold of each node, 'left': left child of each node,
+        'right': right child of each node, 'missing_left': whether missing values go to the left child of each node,
+        'label': predicted class of each node, 'depth': depth of the tree, 'n_features': number of features} dictionary
+
+    Notes
+    -----
+    Leaves are their own children (comparing feature 0 with an infinite threshold), so that samples which reached them
+    stay there
+    """
+
+    tree = classifier.tree_
+    leaves = tree.feature == leaf_feature
+    nodes = numpy.arange(tree.node_count, dtype=numpy.int32)
+
+    return {'feature': numpy.where(leaves, 0, tree.feature).astype(numpy.int32),
+            'threshold': numpy.where(leaves, numpy.inf, tree.threshold),
+            'left': numpy.where(leaves, nodes, tree.children_left).astype(numpy.int32),
+            'right': numpy.where(leaves, nodes, tree.children_right).astype(numpy.int32),
+            # (the child learned for missing values, or the one with more samples if there were none, like
+            #  scikit-learn)
+            'missing_left': tree.missing_go_to_left.astype(bool),
+            # (the most frequent class of each node, the first one in case of a tie, like scikit-learn)
+            'label': classifier.classes_[tree.value[:, 0].argmax(axis=1)],
+            'depth': numpy.array(tree.max_depth),
+            'n_features': numpy.array(classifier.n_features_in_)}
+
+
+def predict(tree: dict[str, numpy.ndarray], features, batch_size: int = 65536) -> numpy.ndarray:
+    """
+    Predicts classes with an exported tree
+
+    Parameters
+    ----------
+    tree: dict[str, numpy.ndarray]
+        Exported tree, as returned by export_tree
+    features: array-like
+        Features of the samples, a row for each sample
+    batch_size: int, default 65536
+        Number of samples predicted at a time
+
+    Returns
+    -------
+    numpy.ndarray
+        Predicted classes
+    """
+
+    features = numpy.asarray(features, dtype=numpy.float32)
+    labels = numpy.empty(len(features), dtype=tree['label'].dtype)
+
+    for start in range(0, len(features), batch_size):
+        batch = features[start:start + batch_size]
+        # (indexed as a flat array, which is faster)
+        flat_batch = batch.ravel()
+        nodes = numpy.zeros(len(batch), dtype=numpy.int32)
+        # move the samples one level down the tree at a time, until all of them reach leaves
+        active = numpy.flatnonzero(tree['left'][nodes] != nodes)
+        while len(active):
+            active_nodes = nodes[active]
+            values = flat_batch[active * batch.shape[1] + tree['feature'][active_nodes]]
+            # (missing values go to the child learned during fitting)
+            go_left = (values <= tree['threshold'][active_nodes]) \
+                | (numpy.isnan(values) & tree['missing_left'][active_nodes])
+            active_nodes = numpy.where(go_left, tree['left'][active_nodes], tree['right'][active_nodes])
+            nodes[active] = active_nodes
+            # (leaves are their own children)
+            active = active[tree['left'][active_nodes] != active_nodes]
+        labels[start:start + batch_size] = tree['label'][nodes]
+
+    return labels
+
+
+def save_tree(tree: dict[str, numpy.ndarray], file_name: str) -> None:
+    """
+    Writes an exported tree to a npz file
+
+    Parameters
+    ----------
+    tree: dict[str, numpy.ndarray]
+        Exported tree, as returned by export_tree
+    file_name: str
+        Name of the npz file
+
+    Returns
+    -------
+    None
+    """
+
+    numpy.savez(file_name, **tree)
+
+
+def load_tree(file_name: str) -> dict[str, numpy.ndarray]:
+    """
+    Reads an exported tree from a npz file
+
+    Parameters
+    ----------
+    file_name: str
+        Name of the npz file
+
+    Returns
+    -------
+    dict[str, numpy.ndarray]
+        Exported tree
+    """
+
+    with numpy.load(file_name) as tree_file:
+        return dict(tree_file)
+
+
+def generate_code(tree: dict[str, numpy.ndarray], function_name: str = 'predict',
+                  feature_names: list[str] | None = None) -> str:
+    """
+    Generates a dependency-free Python function predicting with an exported tree
+
+    Parameters
+    ----------
+    tree: dict[str, numpy.ndarray]
+        Exported tree, as returned by export_tree
+    function_name: str, default 'predict'
+        Name of the generated function
+    feature_names: list[str] | None, default None
+        Names of the arguments of the generated function, x0, x1, ... if None
+
+    Returns
+    -------
+    str
+        Source code of a module with a function predicting the class of a single sample
+
+    Raises
+    ------
+    ValueError
+        If the tree is deeper than max_code_depth
+    """
+
+    if tree['depth'] > max_code_depth:
+        raise ValueError(f"Tree of depth {tree['depth']} is too deep to generate, use predict instead")
+
+    if feature_names is None:
+        feature_names = [f'x{index}' for index in range(int(tree['n_features']))]
+
+    lines = ['import struct', '', '',
+             f"def {function_name}({', '.join(feature_names)}):",
+             '    # round the features to single precision, like scikit-learn',
+             '    # (clamping values beyond its range, which compare with the thresholds like infinities)']
+    lines += [f"    {name} = struct.unpack('f', struct.pack('f', max(min({name}, {float32_max!r}), "
+              f"{-float32_max!r})))[0]" for name in feature_names]
+
+    # write the nodes depth first
+    stack = [(0, 1)]
+    while stack:
+        node, indent = stack.pop()
+        if tree['left'][node] == node:
+            lines.append(f"{'    ' * indent}return {tree['label'][node].item()!r}")
+        else:
+            # (missing values go to the child learned during fitting, NaN <= threshold and NaN > threshold are False)
+            # (thresholds of splits of missing values from the others are infinite)
+            condition = '{} <= {}' if not tree['missing_left'][node] else 'not {} > {}'
+            threshold = float(tree['threshold'][node])
+            threshold = repr(threshold) if numpy.isfinite(threshold) else f"float('{threshold}')"
+            lines.append(f"{'    ' * indent}if {condition.format(feature_names[tree['feature'][node]], threshold)}:")
+            # (the else branch is written after the whole if branch)
+            stack.append((int(tree['right'][node]), -indent - 1))
+            stack.append((int(tree['left'][node]), indent + 1))
+        while stack and stack[-1][1] < 0:
+            node, indent = stack.pop()
+            lines.append(f"{'    ' * (-indent - 1)}else:")
+            stack.append((node, -indent))
+
+    return '\n'.join(lines) + '\n'
+
+
+def verify_tree(classifier, tree: dict[str, numpy.ndarray], features) -> bool:
+    """
+    Checks whether an exported tree predicts the same classes as the fitted one
+
+    Parameters
+    ----------
+    classifier: sklearn.tree.DecisionTreeClassifier
+        Fitted decision tree
+    tree: dict[str, numpy.ndarray]
+        Exported tree, as returned by export_tree
+    features: array-like
+        Features of the samples to compare the predictions on
+
+    Returns
+    -------
+    bool
+        Whether all the predictions are identical
+    """
+
+    return bool(numpy.array_equal(classifier.predict(features), predict(tree, features)))
@@ -0,0 +1,208 @@
+"""
+Script for tuning the hyperparameters of the neighbor, tree and support vector models
+
+Prepares the training data (and vectorizes the profiles) once per analysis, splits it into cross-validation folds once,
+runs grid searches or successive-halving searches on all processors, then saves the best configurations to a json file
+used by 'origin_weight_price.py', 'process_score_price.py' and 'process_profile.py'
+
+Requires installation of 'pandas', 'scikit-learn', 'nltk', 'scipy'
+
+Functions
+---------
+get_training_data
+    Gets the training features and target of an analysis, transformed for its models
+tune
+    Searches for the best hyperparameters of the models, then saves them to a json file
+best_params
+    Gets the saved best hyperparameters of a model
+
+Notes
+-----
+Usage: python tuning.py [--halving] [analysis ...]
+"""
+
+import json
+import os
+import sys
+import numpy
+import data
+import origins
+import processes
+import profiles
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingGridSearchCV)
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV, StratifiedKFold
+from sklearn.neighbors import KNeighborsClassifier, RadiusNeighborsClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+from sklearn.tree import DecisionTreeClassifier
+
+# default name of the file with the best hyperparameters
+best_params_file_name = 'best_params.json'
+
+# {analysis: {model name: (model, hyperparameter grid)}} dictionary
+# (model names as in the results of the analyses)
+search_spaces = {
+    'origin_weight_price': {
+        'Decision Trees': (DecisionTreeClassifier(random_state=0),
+                           {'criterion': ['gini', 'entropy'], 'max_depth': [2, 3, 4, 6, 8, None],
+                            'min_samples_leaf': [1, 2, 4, 8]})
+    },
+    'process_score_price': {
+        'k-Nearest Neighbors': (KNeighborsClassifier(),
+                                {'n_neighbors': [1, 3, 5, 7, 9, 15], 'weights': ['uniform', 'distance']}),
+        # outliers are labelled with the most frequent process, so that small radii cause no Value Error
+        'Fixed-Radius Near Neighbors': (RadiusNeighborsClassifier(),
+                                        {'radius': [0.5, 1, 2, 3, 5, 8, 12], 'weights': ['uniform', 'distance'],
+                                         'outlier_label': ['most_frequent']}),
+        # on the standardized features, like the index of 'neighbors.py' (radii in standard deviations)
+        'k-Nearest Neighbors (standardized)': (make_pipeline(StandardScaler(), KNeighborsClassifier()),
+                                               {'kneighborsclassifier__n_neighbors': [1, 3, 5, 7, 9, 15],
+                                                'kneighborsclassifier__weights': ['uniform', 'distance']}),
+        'Fixed-Radius Near Neighbors (standardized)': (make_pipeline(StandardScaler(), RadiusNeighborsClassifier()),
+                                                       {'radiusneighborsclassifier__radius': [0.1, 0.25, 0.5, 1, 2],
+                                                        'radiusneighborsclassifier__weights': ['uniform', 'distance'],
+                                                        'radiusneighborsclassifier__outlier_label': ['most_frequent']})
+    },
+    'process_profile': {
+        'Support Vector Machines': (SVC(),
+                                    {'kernel': ['rbf', 'linear'], 'C': [0.1, 1, 10, 100],
+                                     'gamma': ['scale', 0.01, 0.1, 1]})
+    }
+}
+
+
+def get_training_data(analysis: str) -> tuple:
+    """
+    Gets the training features and target of an analysis, transformed for its models
+
+    Parameters
+    ----------
+    analysis: str
+        Name of the analysis, a key of search_spaces
+
+    Returns
+    -------
+    tuple
+        Training features (a numpy array or a sparse matrix of vectorized profiles) and target (a numpy array)
+    """
+
+    if analysis == 'origin_weight_price':
+        train_features, train_origins = data.get_data(['Weight', 'Price'], 'Coffee', test=False)
+        train_features, train_origins = origins.simplify_origins(train_features, train_origins)
+        return train_features.to_numpy(), train_origins.to_numpy()
+
+    if analysis == 'process_score_price':
+        train_features, train_processes, test_features, test_processes = data.get_data(['Score', 'Price'], 'Process')
+        train_features, train_processes, _, _ \
+            = processes.simplify_processes(train_features, train_processes, test_features, test_processes,
+                                           print_map=False)
+        return train_features.to_numpy(), train_processes.to_numpy()
+
+    if analysis == 'process_profile':
+        train_profiles, train_processes, test_profiles, test_processes = data.get_data('Profile', 'Process')
+        train_profiles, train_processes, test_profiles, test_processes \
+            = processes.simplify_processes(train_profiles, train_processes, test_profiles, test_processes,
+                                           print_map=False)
+        # vectorize the profiles once for all the folds (cached by 'profiles.py')
+        train_profiles_vector, _, _ = profiles.vectorize(train_profiles, test_profiles)
+        return train_profiles_vector, train_processes.to_numpy()
+
+    raise ValueError(f'Unknown analysis {analysis!r}')
+
+
+def tune(analyses: list[str] | None = None,
+         halving: bool = False,
+         n_splits: int = 5,
+         n_jobs: int = -1,
+         file_name: str | None = best_params_file_name) -> dict[str, dict]:
+    """
+    Searches for the best hyperparameters of the models, then saves them to a json file
+
+    Parameters
+    ----------
+    analyses: list[str] | None, default None
+        Names of the analyses to tune, all the keys of search_spaces if None
+    halving: bool, default False
+        Whether to use successive halving instead of an exhaustive grid search
+    n_splits: int, default 5
+        Number of cross-validation folds, reduced if a class has fewer samples
+    n_jobs: int, default -1
+        Number of parallel jobs, all processors if -1
+    file_name: str | None, default best_params_file_name
+        Name of the json file for the best hyperparameters (merged with its previous contents), not written if None
+
+    Returns
+    -------
+    dict[str, dict]
+        {analysis: {model name: {'params': best hyperparameters, 'score': mean cross-validated accuracy}}} dictionary
+    """
+
+    if analyses is None:
+        analyses = list(search_spaces)
+
+    results = {}
+    for analysis in analyses:
+
+        print(f'\nTuning the models of {analysis}...')
+
+        # prepare the data and the stratified folds once, for all the models of the analysis
+        features, target = get_training_data(analysis)
+        n_folds = max(2, min(n_splits, numpy.unique(target, return_counts=True)[1].min()))
+        folds = list(StratifiedKFold(n_folds, shuffle=True, random_state=0).split(numpy.zeros(len(target)), target))
+
+        results[analysis] = {}
+        for model_name, (model, grid) in search_spaces[analysis].items():
+            search_type = HalvingGridSearchCV if halving else GridSearchCV
+            search = search_type(model, grid, cv=folds, n_jobs=n_jobs)
+            search.fit(features, target)
+            results[analysis][model_name] = {'params': search.best_params_, 'score': float(search.best_score_)}
+            print(f'{model_name}: {search.best_params_}, accuracy (mean cross-validated accuracy): '
+                  f'{search.best_score_:.2f}')
+
+    # merge the results with the previously saved ones
+    if file_name is not None:
+        saved_results = {}
+        if os.path.exists(file_name):
+            with open(file_name) as best_params_file:
+                saved_results = json.load(best_params_file)
+        for analysis, models_results in results.items():
+            saved_results.setdefault(analysis, {}).update(models_results)
+        with open(file_name, 'w') as best_params_file:
+            json.dump(saved_results, best_params_file, indent=4)
+
+    return results
+
+
+def best_params(analysis: str, model_name: str, file_name: str = best_params_file_name) -> dict:
+    """
+    Gets the saved best hyperparameters of a model
+
+    Parameters
+    ----------
+    analysis: str
+        Name of the analysis
+    model_name: str
+        Name of the model
+    file_name: str, default best_params_file_name
+        Name of the json file with the best hyperparameters
+
+    Returns
+    -------
+    dict
+        Best hyperparameters found by tune (without the step names of pipelines), empty if the model has not been tuned
+    """
+
+    if not os.path.exists(file_name):
+        return {}
+
+    with open(file_name) as best_params_file:
+        params = json.load(best_params_file).get(analysis, {}).get(model_name, {}).get('params', {})
+
+    # (e.g. 'kneighborsclassifier__n_neighbors' -> 'n_neighbors')
+    return {name.rsplit('__', 1)[-1]: value for name, value in params.items()}
+
+
+if __name__ == '__main__':
+    tune([argument for argument in sys.argv[1:] if argument != '--halving'] or None,
+         halving='--halving' in sys.argv[1:])